@@ -2,16 +2,31 @@ from data_utils import *
 from rdflib import Graph, RDF, OWL
 
 import random
+import bisect
+import heapq
+import numpy as np
 
 class Agent:
-	def __init__(self, ID, graph_path, namespace=None):
+	def __init__(self, ID, graph_path, namespace=None, ontology_cache_dir=None):
 
 		self.properties_frequency = None
-		self.graph = Graph()
-		self.graph.parse(graph_path)
+		# the parsed graph is shared among all agents that use the same ontology, and it is only read
+		self.graph = load_ontology_graph(graph_path, cache_dir=ontology_cache_dir)
 
 		self.agent_ID = ID
 		self.namespace = namespace
+		# all rdf:type lookups are answered by a two-way index, that is built once, instead of querying the graph
+		self.build_type_index()
+		# every agent has its own random number generator, that is seeded per game (see set_random_seed),
+		# so that games are reproducible independently of the order (or the process) in which they are executed
+		self.random_generator = random.Random()
+
+	def set_random_seed(self, seed):
+		'''
+		Reseeds the random number generator of the agent
+		:param seed: integer seed, or None for an unpredictable seed
+		'''
+		self.random_generator.seed(seed)
 
 	def reset_fca_datastructures(self):
 		self.concept_fca_structure = None
@@ -21,46 +36,88 @@ class Agent:
 	def get_positive_property_set_IDs_that_include_property(self, property, exact_match=True):
 		'''
 		this function returns all concept IDs that contain at least this characteristic
-		:param property:
+		:param property: the (interned) ID of the property
 		:return: set of concept IDs
 		'''
-		filtered_concept_IDs = set()
-		characteristic_frozenset = frozenset({property})
-		for concept in self.positive_property_set_to_its_ID:
-			if (exact_match and characteristic_frozenset == concept) or (exact_match == False and property in set(concept)):
-				filtered_concept_IDs.add(self.positive_property_set_to_its_ID[concept])
-		return filtered_concept_IDs
+		if exact_match:
+			# the only concept that can match exactly, is the one that consists of this characteristic alone
+			concept_ID = self.positive_property_set_to_its_ID.get(1 << property)
+			return set() if concept_ID is None else {concept_ID}
+		return set(self.property_to_positive_property_set_IDs.get(property, ()))
+
 
+	def build_type_index(self):
+		'''
+		Indexes the rdf:type triples of the graph, from every class to its instances and from every instance to its classes,
+		over IDs that are interned separately from the object and property IDs (which only refer to the objects used in the games)
+		'''
+		self.instance_vocabulary = URIVocabulary()
+		self.class_vocabulary = URIVocabulary()
+		self.class_ID_to_instance_IDs = defaultdict(set)
+		self.instance_ID_to_class_IDs = defaultdict(set)
+		for instance, _, class_URI in self.graph.triples((None, RDF.type, None)):
+			instance_ID = self.instance_vocabulary.register(instance)
+			class_ID = self.class_vocabulary.register(class_URI)
+			self.class_ID_to_instance_IDs[class_ID].add(instance_ID)
+			self.instance_ID_to_class_IDs[instance_ID].add(class_ID)
+		self.named_individuals = frozenset(self.get_class_instances(OWL.NamedIndividual))
+
+	def get_class_instances(self, class_URI):
+		'''
+		:param class_URI: the URI of a class
+		:return: set with the URIs of the instances of the class
+		'''
+		class_ID = self.class_vocabulary.get_ID(class_URI)
+		return self.instance_vocabulary.get_URIs(self.class_ID_to_instance_IDs.get(class_ID, ()))
 
 	def get_all_named_individuals(self):
-		return set(self.graph.subjects(RDF.type, OWL.NamedIndividual))
+		return self.named_individuals
 
 
 # -------------------- Agent Introspection Functions (Preparing groups of objects and Concepts, etc.)
 
 	def prepare_groups_and_concepts(self, common_objects=None):
+		# All objects and properties (classes) are interned into dense integer IDs, which are used by all the following data structures.
+		# URIs are only used when communicating with other agents (examples) and when reporting query results.
+		self.object_vocabulary = URIVocabulary()
+		self.property_vocabulary = URIVocabulary()
+
 		# Characteristics are a set of Boolean (True) properties that describe an object
 		# We want to know, and be able to identify, existing combinations of characteristics (in objects)
 		self.object_group_ID_to_object_properties = {}
+		# the same property sets, represented as bitmasks over the property IDs, so that groups can be compared with bitwise operations
+		self.object_group_ID_to_property_mask = {}
 		self.object_properties_to_object_group_ID = {}
 		# a dictionary mapping object symbols with the group ID that they fall under, w.r.t. the characteristics
 		self.object_to_object_group_ID = {}
 		# Objects are grouped together if they have exactly the same characteristics
 		self.object_properties_to_objects = defaultdict(set)
-		# The above 4 dictionaries are filled by the next function
+		# the objects of every group in a list, so that they can be indexed when sampling teaching examples
+		self.object_group_ID_to_objects = {}
+		# the objects of every group as a bitmask over the object IDs, so that query results can be evaluated per group
+		self.object_group_ID_to_object_mask = {}
+		# inverted index, from every property ID to the IDs of the object groups that have it
+		self.property_to_object_group_IDs = defaultdict(list)
+		# The above 8 dictionaries are filled by the next function
 		if common_objects is None:
 			common_objects = self.get_all_named_individuals()
 		self.calculate_groups_of_objects(common_objects)
 
 		# concepts are composed using the same characteristics
 		# concepts are more abstract than objects, and can be perceived as "Classes"
+		# positive property sets are represented (and keyed) by their property bitmasks
 		self.positive_property_set_to_its_ID = {}
 		self.ID_of_a_positive_property_set = {}
+		# inverted index, from every property ID to the IDs of the positive property sets that include it
+		self.property_to_positive_property_set_IDs = defaultdict(set)
 		# it is important to remember the comparison, of which groups' characteristics generated this concept
 		# the following dictionary, has as values sets of tupples of group ID "(ID1, ID2)" ...
 		# resembling the set operator : Set_of_characteristics_of_Group_1 - Set_of_characteristics_of_Group_2
 		self.positive_property_set_ID_to_group_comparisons = defaultdict(set)
 		self.comparison_to_concept_ID = {}
+		# matrices used for simulating many games at once, built when they are first needed (see prepare_batch_datastructures)
+		self.object_group_property_incidence = None
+		self.object_to_object_group_ID_array = None
 		self.calculate_all_positive_property_sets()
 
 
@@ -81,9 +138,8 @@ class Agent:
 		:param return_frozen_set: whether to return a set or type cast it to frozen set
 		:return: a (frozen)set with the boolean characteristics of the object
 		'''
-		object_properties = set()
-		for _, _, class_URI in self.graph.triples((object, RDF.type, None)):
-			object_properties.add(class_URI)
+		object_ID = self.instance_vocabulary.get_ID(object)
+		object_properties = self.class_vocabulary.get_URIs(self.instance_ID_to_class_IDs.get(object_ID, ()))
 		if return_frozen_set:
 			# typecasting from "set" to hashable type "frozenset"
 			return frozenset(object_properties)
@@ -98,9 +154,12 @@ class Agent:
 		self.properties_frequency = defaultdict(int)
 
 		# we "read" the properties of every object and then group objects according to their properties
-		for object in objects:
-			# retrieve its properties
-			objects_properties = self.get_object_properties(object)
+		# (objects and properties are visited in sorted order, so that their IDs, and all results, do not depend on python's string hashing)
+		for object in sorted(objects):
+			object_ID = self.object_vocabulary.register(object)
+			# retrieve its properties, and refer to them by their IDs
+			objects_properties = frozenset(self.property_vocabulary.register(object_property)
+										   for object_property in sorted(self.get_object_properties(object, return_frozen_set=False)))
 			for object_property in set(objects_properties):
 				self.properties_frequency[object_property] += 1
 			# retrieve the group ID of this set
@@ -111,9 +170,16 @@ class Agent:
 				# register the new set, and its ID
 				self.object_properties_to_object_group_ID[objects_properties] = object_group_ID
 				self.object_group_ID_to_object_properties[object_group_ID] = objects_properties
+				self.object_group_ID_to_property_mask[object_group_ID] = IDs_to_bitmask(objects_properties)
+				for object_property in objects_properties:
+					self.property_to_object_group_IDs[object_property].append(object_group_ID)
 
-			self.object_properties_to_objects[objects_properties].add(object)
-			self.object_to_object_group_ID[object] = object_group_ID
+			self.object_properties_to_objects[objects_properties].add(object_ID)
+			self.object_to_object_group_ID[object_ID] = object_group_ID
+
+		for object_group_ID, objects_properties in self.object_group_ID_to_object_properties.items():
+			self.object_group_ID_to_objects[object_group_ID] = list(self.object_properties_to_objects[objects_properties])
+			self.object_group_ID_to_object_mask[object_group_ID] = IDs_to_bitmask(self.object_group_ID_to_objects[object_group_ID])
 
 
 	def calculate_all_positive_property_sets(self):
@@ -123,39 +189,31 @@ class Agent:
 			(since they are calculated based on their combinations)
 		'''
 
-		object_group_IDs = self.object_group_ID_to_object_properties.keys()
+		object_group_IDs_and_property_masks = list(self.object_group_ID_to_property_mask.items())
 		# For all pairwise combinations of groups
-		for object_group_ID_A in object_group_IDs:
-			for object_group_ID_B in object_group_IDs:
+		for object_group_ID_A, property_mask_of_group_A in object_group_IDs_and_property_masks:
+			for object_group_ID_B, property_mask_of_group_B in object_group_IDs_and_property_masks:
 
 				# we do not want to compare the same group with itself (as it will always produce an empty set)
 				if object_group_ID_A == object_group_ID_B:
 					continue
 
-				properties_of_group_A = self.object_group_ID_to_object_properties[object_group_ID_A]
-				properties_of_group_B = self.object_group_ID_to_object_properties[object_group_ID_B]
-
-				# typecasting from "frozenset" to "set", so that Set operators can be applied
-				properties_of_group_A = set(properties_of_group_A)
-				properties_of_group_B = set(properties_of_group_B)
-
-				positive_property_set_of_object_group_comparison = properties_of_group_A - properties_of_group_B
+				# the set difference "Properties_of_Group_A - Properties_of_Group_B", as a single bitwise AND-NOT
+				positive_property_set_of_object_group_comparison = property_mask_of_group_A & ~property_mask_of_group_B
 
 				# we don't care about concepts without any characteristics
-				if len(positive_property_set_of_object_group_comparison) == 0:
+				if positive_property_set_of_object_group_comparison == 0:
 					continue
 
-				# typecasting from "set" to hashable type "frozenset"
-				positive_property_set_of_object_group_comparison = frozenset(positive_property_set_of_object_group_comparison)
-
 				# retrieve the ID of this concept
-				if positive_property_set_of_object_group_comparison in self.positive_property_set_to_its_ID:
-					positive_property_set_ID = self.positive_property_set_to_its_ID[positive_property_set_of_object_group_comparison]
-				else:
+				positive_property_set_ID = self.positive_property_set_to_its_ID.get(positive_property_set_of_object_group_comparison)
+				if positive_property_set_ID is None:
 					positive_property_set_ID = len(self.positive_property_set_to_its_ID)
 					# register the new set, and its ID
 					self.positive_property_set_to_its_ID[positive_property_set_of_object_group_comparison] = positive_property_set_ID
 					self.ID_of_a_positive_property_set[positive_property_set_ID] = positive_property_set_of_object_group_comparison
+					for property_ID in bitmask_to_IDs(positive_property_set_of_object_group_comparison):
+						self.property_to_positive_property_set_IDs[property_ID].add(positive_property_set_ID)
 
 				# adding the comparison that can lead to this positive property set ID ...
 				# in a set with other comparisons of object groups that result to the same positive property set
@@ -164,13 +222,13 @@ class Agent:
 				self.comparison_to_concept_ID[(object_group_ID_A, object_group_ID_B)] = positive_property_set_ID
 
 	def get_positive_property_set_IDs_from_powerset_of_positive_property_set(self, positive_property_set_ID):
-		positive_property_set = set(self.ID_of_a_positive_property_set[positive_property_set_ID])
+		positive_property_set = bitmask_to_IDs(self.ID_of_a_positive_property_set[positive_property_set_ID])
 		powerset_of_positive_property_set = powerset(positive_property_set)
 		positive_property_powerset_IDs = set()
 		for properties_set in powerset_of_positive_property_set:
-			frozen_properties_set = frozenset(properties_set)
-			if frozen_properties_set in self.positive_property_set_to_its_ID:
-				positive_powerset_element_ID = self.positive_property_set_to_its_ID[frozen_properties_set]
+			properties_bitmask = IDs_to_bitmask(properties_set)
+			if properties_bitmask in self.positive_property_set_to_its_ID:
+				positive_powerset_element_ID = self.positive_property_set_to_its_ID[properties_bitmask]
 				positive_property_powerset_IDs.add(positive_powerset_element_ID)
 		return positive_property_powerset_IDs
 
@@ -182,6 +240,8 @@ class Agent:
 		self.instance_mapping_dict = instance_mapping_dict
 		common_instance_set = set(instance_mapping_dict.keys())
 		self.prepare_groups_and_concepts(common_objects=common_instance_set)
+		# teacher preparations per (query, teacher policy), reused across repetitions of the same query
+		self.prepared_teacher_per_query = {}
 
 # --------- Util Functions
 	def translate_URIs_for_other_agent(self, URI_set):
@@ -197,57 +257,61 @@ class Agent:
 
 # --------- Teacher Functions
 
-	def reset_as_teacher(self, query_property, teacher_policy):
-		teacher_policy_accepted_values = ["random", "property-based"]
-
-		if teacher_policy.lower() not in teacher_policy_accepted_values:
-			raise ValueError("Wrong teacher policy provided: " + teacher_policy)
-
-		self.teacher_policy = teacher_policy
-		self.unclear_episodes = set()
-
-		self.related_positive_property_set_IDs = self.get_positive_property_set_IDs_that_include_property(query_property, exact_match=False)
-
-		self.example_pool = list()
-		self.example_probabilities = list()
-		# self.example_indices = list()
-
-		self.semantic_memory_variables = []
-		self.episodic_memory_variables = []
-
-		# prepare data structure to save unclear examples
-		self.episodic_memory_variables.append(self.unclear_episodes)
+	def prepare_teacher_for_query(self, query_property, teacher_policy):
+		'''
+		Computes everything the teacher needs for teaching a query, that does not change while teaching it.
+		:param query_property: the URI of the query property
+		:param teacher_policy: {"random", "property-based"}
+		:return: dictionary with the group comparisons that generate the examples of this query, their scores,
+		the sampler of group comparisons (that should be copied before being used), and the number of examples
+		'''
+		# properties that no common object has, are not known to this agent's vocabulary, and no examples can be given for them
+		query_property = self.property_vocabulary.get_ID(query_property)
+		if query_property is None:
+			related_positive_property_set_IDs = set()
+		else:
+			related_positive_property_set_IDs = self.get_positive_property_set_IDs_that_include_property(query_property, exact_match=False)
+
+		# The pool of examples is not materialised, since it is the cartesian product of the objects of every group comparison.
+		# Instead, we keep the group comparisons (relevant_object_group_ID, irrelevant_object_group_ID) that can generate examples,
+		# along with the score of their examples. An example is then sampled in two stages: first a group comparison is selected,
+		# proportionally to its score times its number of remaining examples, and then one of its remaining examples is uniformly selected.
+		# This results to the same distribution as sampling from all examples proportionally to their scores.
+		example_group_comparisons = list()
+		example_group_comparison_scores = list()
+		example_group_comparison_weights = list()
+		num_examples_in_pool = 0
 
 		# populate the example pool for this particular query / property
-		for positive_property_set_ID in self.related_positive_property_set_IDs:
+		for positive_property_set_ID in related_positive_property_set_IDs:
 
 			for (relevant_object_group_ID, irrelevant_object_group_ID) in self.positive_property_set_ID_to_group_comparisons[positive_property_set_ID]:
 
-				relevant_objects = self.object_properties_to_objects[self.object_group_ID_to_object_properties[relevant_object_group_ID]]
-				irrelevant_objects = self.object_properties_to_objects[self.object_group_ID_to_object_properties[irrelevant_object_group_ID]]
+				num_relevant_objects = len(self.object_group_ID_to_objects[relevant_object_group_ID])
+				num_irrelevant_objects = len(self.object_group_ID_to_objects[irrelevant_object_group_ID])
 
-				if self.teacher_policy == "property-based":
+				if teacher_policy == "property-based":
 
-					# retrieving characteristics of group objects
-					relevant_object_properties = set(self.object_group_ID_to_object_properties[relevant_object_group_ID])
-					irrelevant_object_properties = set(self.object_group_ID_to_object_properties[irrelevant_object_group_ID])
+					# retrieving characteristics of group objects (as property bitmasks)
+					relevant_object_properties = self.object_group_ID_to_property_mask[relevant_object_group_ID]
+					irrelevant_object_properties = self.object_group_ID_to_property_mask[irrelevant_object_group_ID]
 					# calculating the overlap between the query property and the positive characteristics of the examples that these groups can generate
-					positive_property_set = relevant_object_properties - irrelevant_object_properties
+					positive_property_set = relevant_object_properties & ~irrelevant_object_properties
 
 					# misguiding properties of an example are the ones that are in its positive property set, but are not the query property
-					misguiding_positive_properties = positive_property_set - {query_property}
+					misguiding_positive_properties = positive_property_set & ~(1 << query_property)
 					example_misinterpretation_prob_sum = 0
-					for misguiding_property in misguiding_positive_properties:
+					for misguiding_property in bitmask_to_IDs(misguiding_positive_properties):
 						# probability of each property is equal to the number of objects that have it, against all objects (referring to common objects in both cases)
 						example_misinterpretation_prob_sum += self.properties_frequency[misguiding_property] / len(self.instance_mapping_dict)
 
 					# calculating the sum of probabilities of the negative
-					negative_property_set = irrelevant_object_properties - relevant_object_properties
-					common_property_set = irrelevant_object_properties.intersection(relevant_object_properties)
-					
-					concept_excluding_characteristics = negative_property_set.union(common_property_set)
+					negative_property_set = irrelevant_object_properties & ~relevant_object_properties
+					common_property_set = irrelevant_object_properties & relevant_object_properties
+
+					concept_excluding_characteristics = negative_property_set | common_property_set
 					example_excluding_char_prob_sum = 0
-					for misguiding_property in concept_excluding_characteristics:
+					for misguiding_property in bitmask_to_IDs(concept_excluding_characteristics):
 						# probability of each property is equal to the number of objects that have it, against all objects (referring to common objects in both cases)
 						example_excluding_char_prob_sum += self.properties_frequency[misguiding_property] / len(self.instance_mapping_dict)
 
@@ -260,60 +324,141 @@ class Agent:
 				else:
 					example_scores = 1
 
-				for relevant_object in relevant_objects:
-					for irrelevant_object in irrelevant_objects:
-						example = (relevant_object, irrelevant_object)
-						self.example_pool.append(example)
-						self.example_probabilities.append(example_scores)
+				num_group_comparison_examples = num_relevant_objects * num_irrelevant_objects
+				example_group_comparisons.append((relevant_object_group_ID, irrelevant_object_group_ID))
+				example_group_comparison_scores.append(example_scores)
+				example_group_comparison_weights.append(example_scores * num_group_comparison_examples)
+				num_examples_in_pool += num_group_comparison_examples
+
+		prepared_teacher = dict()
+		prepared_teacher["related_positive_property_set_IDs"] = related_positive_property_set_IDs
+		prepared_teacher["example_group_comparisons"] = example_group_comparisons
+		prepared_teacher["example_group_comparison_scores"] = example_group_comparison_scores
+		# group comparisons are sampled (and their weights are updated when examples are removed) in O(log n) time
+		prepared_teacher["example_group_comparison_sampler"] = WeightedIndexSampler(example_group_comparison_weights)
+		prepared_teacher["num_examples_in_pool"] = num_examples_in_pool
+		return prepared_teacher
+
+	def get_prepared_teacher(self, query_property, teacher_policy):
+		'''
+		The same query is taught many times (repetitions), so we only prepare the teacher for it once
+		:return: the prepared teacher, as returned by prepare_teacher_for_query
+		'''
+		prepared_teacher_key = (query_property, teacher_policy)
+		if prepared_teacher_key not in self.prepared_teacher_per_query:
+			self.prepared_teacher_per_query[prepared_teacher_key] = self.prepare_teacher_for_query(query_property, teacher_policy)
+		return self.prepared_teacher_per_query[prepared_teacher_key]
+
+	def reset_as_teacher(self, query_property, teacher_policy):
+		teacher_policy_accepted_values = ["random", "property-based"]
+
+		if teacher_policy.lower() not in teacher_policy_accepted_values:
+			raise ValueError("Wrong teacher policy provided: " + teacher_policy)
+
+		self.teacher_policy = teacher_policy
+		self.unclear_episodes = set()
+
+		# only the state that changes while teaching is copied from the prepared teacher
+		prepared_teacher = self.get_prepared_teacher(query_property, teacher_policy)
+
+		self.related_positive_property_set_IDs = prepared_teacher["related_positive_property_set_IDs"]
+		self.example_group_comparisons = prepared_teacher["example_group_comparisons"]
+		self.example_group_comparison_scores = prepared_teacher["example_group_comparison_scores"]
+		self.example_group_comparison_sampler = prepared_teacher["example_group_comparison_sampler"].copy()
+		# examples are removed from the pool by excluding their positions in the (flattened) cartesian product of their group comparison.
+		# the excluded positions of each group comparison are kept sorted.
+		self.excluded_example_positions = defaultdict(list)
+		self.num_examples_in_pool = prepared_teacher["num_examples_in_pool"]
+
+		self.semantic_memory_variables = []
+		self.episodic_memory_variables = []
+
+		# prepare data structure to save unclear examples
+		self.episodic_memory_variables.append(self.unclear_episodes)
 
 		# if we cannot construct any examples for this query, then we report that the teacher cannot initiate this experiment
-		total_examples = len(self.example_pool)
-		if total_examples == 0:
+		if self.num_examples_in_pool == 0:
 			return False
-		# normalise example probabilities
-		weighted_sum = sum(self.example_probabilities)
-		self.example_probabilities = [weight / weighted_sum for weight in self.example_probabilities]
 		return True
 
 	def select_next_teaching_example(self):
 		# if there are no more examples the Teacher can give, we return None to signal it
-		if len(self.example_pool) == 0:
+		if self.num_examples_in_pool == 0:
 			return None
 
-		example_indices = list(range(len(self.example_pool)))
-		example_index = random.choices(population=example_indices, weights=self.example_probabilities)[0]
+		# first, we select a group comparison, proportionally to the sum of the scores of its remaining examples
+		group_comparison_index = self.example_group_comparison_sampler.sample(self.random_generator)
 
-		example = self.example_pool[example_index]
+		# then, we uniformly select one of its remaining examples
+		example_position, example = self.select_remaining_example_of_group_comparison(group_comparison_index, self.excluded_example_positions,
+																					   self.random_generator)
 
 		self.teaching_example_episode_memory = dict()
-		self.teaching_example_episode_memory["example_index"] = example_index
+		self.teaching_example_episode_memory["group_comparison_index"] = group_comparison_index
+		self.teaching_example_episode_memory["example_position"] = example_position
 		self.teaching_example_episode_memory["example"] = example
 
 		# translating the example by using the URIs of the other agent to refer to the same instances - world objects.
-		translated_example = (self.instance_mapping_dict[example[0]], self.instance_mapping_dict[example[1]])
+		translated_example = (self.instance_mapping_dict[self.object_vocabulary.get_URI(example[0])],
+							  self.instance_mapping_dict[self.object_vocabulary.get_URI(example[1])])
 
 		return translated_example
 
+	def select_remaining_example_of_group_comparison(self, group_comparison_index, excluded_example_positions, random_generator):
+		'''
+		Uniformly selects one of the examples of a group comparison, that have not been excluded
+		:param excluded_example_positions: dictionary from group comparison indices to the sorted lists of their excluded example positions
+		:return: the position of the example (in the cartesian product of the objects of the two groups), and the example (object IDs)
+		'''
+		relevant_object_group_ID, irrelevant_object_group_ID = self.example_group_comparisons[group_comparison_index]
+		relevant_objects = self.object_group_ID_to_objects[relevant_object_group_ID]
+		irrelevant_objects = self.object_group_ID_to_objects[irrelevant_object_group_ID]
+		excluded_example_positions = excluded_example_positions.get(group_comparison_index, [])
+
+		num_remaining_examples = len(relevant_objects) * len(irrelevant_objects) - len(excluded_example_positions)
+		example_position = random_generator.randrange(num_remaining_examples)
+		# skipping the excluded positions that precede the selected one
+		for excluded_example_position in excluded_example_positions:
+			if excluded_example_position > example_position:
+				break
+			example_position += 1
+
+		relevant_object_index, irrelevant_object_index = divmod(example_position, len(irrelevant_objects))
+		return example_position, (relevant_objects[relevant_object_index], irrelevant_objects[irrelevant_object_index])
+
+	def get_remaining_group_comparison_weight(self, group_comparison_index, excluded_example_positions):
+		'''
+		:return: the weight of a group comparison, according to its examples that have not been excluded
+		'''
+		relevant_object_group_ID, irrelevant_object_group_ID = self.example_group_comparisons[group_comparison_index]
+		num_remaining_examples = len(self.object_group_ID_to_objects[relevant_object_group_ID]) * \
+								 len(self.object_group_ID_to_objects[irrelevant_object_group_ID]) - len(excluded_example_positions)
+		return self.example_group_comparison_scores[group_comparison_index] * num_remaining_examples
+
 	# 	run the example by the student
 	def comprehend_students_response_on_example(self, successfully_comprehended):
 		# The teacher's policy dictates the agent to memorise failed examples so that they are not used in the future,
 		# So, we save then in the memory, (increasing the episodic memory size)
 		if successfully_comprehended == False:
 			example = self.teaching_example_episode_memory["example"]
-			example_index = self.teaching_example_episode_memory["example_index"]
-			# remove this example and its score from the pool of examples
-			del self.example_pool[example_index]
-			del self.example_probabilities[example_index]
+			group_comparison_index = self.teaching_example_episode_memory["group_comparison_index"]
+			example_position = self.teaching_example_episode_memory["example_position"]
+			# remove this example from the pool of examples, by excluding its position in its group comparison
+			excluded_example_positions = self.excluded_example_positions[group_comparison_index]
+			bisect.insort(excluded_example_positions, example_position)
+			self.num_examples_in_pool -= 1
+			# and update the weight of its group comparison, according to its remaining examples
+			self.example_group_comparison_sampler.update(group_comparison_index,
+														 self.get_remaining_group_comparison_weight(group_comparison_index, excluded_example_positions))
 			# "memorize" the unclear example
 			self.unclear_episodes.add(example)
 
-			# re-normalising probabilities
-			weighted_sum = sum(self.example_probabilities)
-			self.example_probabilities = [weight / weighted_sum for weight in self.example_probabilities]
-
 	# -------- Student Functions :
 	def reset_as_student(self, student_policy):
 		self.student_policy = student_policy.lower()
+		# increased with every change of the student's state (its interpretation of the query),
+		# so that its query results only need to be computed (and evaluated) again when it has changed
+		self.student_state_version = 0
 
 		if self.student_policy == "frequency-based":
 			self.property_scores = defaultdict(int)
@@ -322,6 +467,10 @@ class Agent:
 		elif self.student_policy == "logic-based":
 			self.query_pseudo_symbol = "fca_property_pseudo_symbol"
 			self.memorised_example_properties = set()
+			# the formal context of the memorised examples (with the query pseudo symbol added to each one of them),
+			# which is updated with every new example. As before, it includes an object with only an artificial "padded_property".
+			self.episodic_fca_context = IncrementalFormalContext(tracked_attributes=[self.query_pseudo_symbol])
+			self.episodic_fca_context.add_object({"padded_property"})
 			self.episodic_memory_variables = [self.memorised_example_properties]
 			self.semantic_memory_variables = []
 		else:
@@ -329,82 +478,112 @@ class Agent:
 
 	def learn_from_example(self, example):
 		'''
-		:param example: (relevant_object, irrelevant_object)
+		:param example: (relevant_object, irrelevant_object), using the URIs of this agent
 		:return: (Boolean) unclear example
 		'''
-		relevant_object, irrelevant_object = example
+		relevant_object = self.object_vocabulary.get_ID(example[0])
+		irrelevant_object = self.object_vocabulary.get_ID(example[1])
 
-		relevant_object_properties = set(self.object_group_ID_to_object_properties[self.object_to_object_group_ID[relevant_object]])
-		irrelevant_object_properties = set(self.object_group_ID_to_object_properties[self.object_to_object_group_ID[irrelevant_object]])
+		relevant_object_properties = self.object_group_ID_to_property_mask[self.object_to_object_group_ID[relevant_object]]
+		irrelevant_object_properties = self.object_group_ID_to_property_mask[self.object_to_object_group_ID[irrelevant_object]]
 
-		example_positive_property_set = relevant_object_properties - irrelevant_object_properties
-		example_common_property_set = irrelevant_object_properties.intersection(relevant_object_properties)
+		example_positive_property_set = relevant_object_properties & ~irrelevant_object_properties
+		example_common_property_set = irrelevant_object_properties & relevant_object_properties
 
-		examples_is_unclear = len(example_positive_property_set) == 0
+		examples_is_unclear = example_positive_property_set == 0
 
 		if examples_is_unclear:
 			return False
 
 		if self.student_policy == "logic-based":
-			self.memorised_example_properties.add(frozenset(example_positive_property_set))
+			# examples are memorised as the bitmasks of their positive property sets
+			if example_positive_property_set not in self.memorised_example_properties:
+				self.memorised_example_properties.add(example_positive_property_set)
+				example_properties = bitmask_to_IDs(example_positive_property_set)
+				example_properties.append(self.query_pseudo_symbol)
+				self.episodic_fca_context.add_object(example_properties)
+				self.student_state_version += 1
 
 		elif self.student_policy == "frequency-based":
 			# increase the score of each property in the properties to reinforce (positive property set of example)
-			for property_to_reinforce in example_positive_property_set:
+			for property_to_reinforce in bitmask_to_IDs(example_positive_property_set):
 				self.property_scores[property_to_reinforce] += 1
 			# decrease the score of each property in the properties to weaken (common property set of example)
-			for property_to_weaken in example_common_property_set:
+			for property_to_weaken in bitmask_to_IDs(example_common_property_set):
 				self.property_scores[property_to_weaken] -= 1
+			self.student_state_version += 1
 
 		return True
 
-
 	def get_student_query_results(self):
+		'''
+		:return: an iterator over the query results (URIs), in ranked order
+		'''
+		return self.iterate_object_groups_objects(self.get_student_query_result_object_groups())
 
+	def get_student_query_result_object_groups(self):
+		'''
+		The query results are all objects of some object groups, so they are computed (and can be evaluated) per group
+		:return: an iterator over the IDs of the object groups of the query results, in ranked order
+		'''
 		if self.student_policy == "logic-based":
 			query_interpretation_char_weights = self.infer_query_interpretation_from_episodes_using_fca()
 		else:
 			query_interpretation_char_weights = self.get_current_freq_query_interpretation()
-
-		query_results = self.execute_query(query_interpretation_char_weights)
-
-		return query_results
+		return self.rank_query_object_groups(query_interpretation_char_weights)
 
 	def execute_query(self, query_interpretation_char_weights):
 		'''
-		:param query_interpretation_char_weights: a dictionary of property-weight pairs.
-		:return: an ordered list of query results
+		:param query_interpretation_char_weights: a dictionary of property ID-weight pairs.
+		:return: an iterator over the query results (URIs), in ranked order
 		'''
+		return self.iterate_object_groups_objects(self.rank_query_object_groups(query_interpretation_char_weights))
 
-		query_interpretation_properties_with_positive_weights = set()
-		for group_property in query_interpretation_char_weights:
-			if query_interpretation_char_weights[group_property] > 0:
-				query_interpretation_properties_with_positive_weights.add(group_property)
-
-		query_interpretation_properties_with_positive_weights = {URIRef(some_property) for some_property in query_interpretation_properties_with_positive_weights}
-
-		#  we gather all object groups, the properties of which are a subset of the interpretation properties,
+	def rank_query_object_groups(self, query_interpretation_char_weights):
+		'''
+		:param query_interpretation_char_weights: a dictionary of property ID-weight pairs.
+		:return: an iterator over the IDs of the object groups of the query results, in ranked order
+		'''
+		# the scores of the object groups are the product of the (sparse) group-property incidence matrix with the weights.
+		# The matrix is stored by columns, as the inverted index from properties to object groups,
+		# so only the groups that have at least one weighted property are visited.
+		object_group_scores = defaultdict(int)
+		#  we gather all object groups that have at least one property with positive weight,
 		#  and then we rank groups' objects according to the scores.
-		object_group_IDs_and_scores = []
-		for object_group_ID in self.object_group_ID_to_object_properties:
-			group_properties = set(self.object_group_ID_to_object_properties[object_group_ID])
-
-			if len(query_interpretation_properties_with_positive_weights.intersection(group_properties)) != 0:
-				object_group_score = 0
-				for group_property in group_properties:
-					if group_property in query_interpretation_char_weights:
-						object_group_score += query_interpretation_char_weights[group_property]
-				# return objects from all related groups
-				object_group_IDs_and_scores.append((object_group_ID, object_group_score))
-
-		# get candidate groups in ranked descending order, according to matching score with interpretation
-		ranked_candidate_groups = sorted(object_group_IDs_and_scores, key=lambda x: x[1], reverse=True)
-		ranked_candidate_objects = []
-		for object_group_ID, _ in ranked_candidate_groups:
-			group_properties = self.object_group_ID_to_object_properties[object_group_ID]
-			ranked_candidate_objects += self.object_properties_to_objects[group_properties]
-
-		return ranked_candidate_objects
+		candidate_object_group_IDs = set()
+		for query_property, property_weight in query_interpretation_char_weights.items():
+			if property_weight == 0:
+				continue
+			property_object_group_IDs = self.property_to_object_group_IDs.get(query_property, ())
+			for object_group_ID in property_object_group_IDs:
+				object_group_scores[object_group_ID] += property_weight
+			if property_weight > 0:
+				candidate_object_group_IDs.update(property_object_group_IDs)
+
+		# candidate groups are ranked in descending order of their scores (and in ascending order of their IDs, in case of ties)
+		ranked_candidate_groups = [(-object_group_scores[object_group_ID], object_group_ID) for object_group_ID in candidate_object_group_IDs]
+		return self.iterate_ranked_object_groups(ranked_candidate_groups)
+
+	def iterate_ranked_object_groups(self, ranked_candidate_groups):
+		'''
+		Lazily yields the candidate groups in ranked order, so that groups are only ordered as far as the results are consumed
+		:param ranked_candidate_groups: list of (negated score, object group ID) pairs
+		:return: generator of the object group IDs, in ranked order
+		'''
+		heapq.heapify(ranked_candidate_groups)
+		while ranked_candidate_groups:
+			_, object_group_ID = heapq.heappop(ranked_candidate_groups)
+			yield object_group_ID
+
+	def iterate_object_groups_objects(self, object_group_IDs):
+		'''
+		:param object_group_IDs: an iterable of object group IDs
+		:return: generator of the URIs of the objects of the groups, group by group
+		'''
+		for object_group_ID in object_group_IDs:
+			for object_ID in self.object_group_ID_to_objects[object_group_ID]:
+				# translating object IDs to URIs, for the query results to be reported
+				yield self.object_vocabulary.get_URI(object_ID)
 
 # ------------------------ Using frequency of properties method to infer symbol interpretation
 	def get_current_freq_query_interpretation(self):
@@ -421,22 +600,175 @@ class Agent:
 		if len(self.memorised_example_properties) == 0:
 			return {}
 
-		memorized_properties_per_example = []
-		memorized_properties_per_example.append({"padded_property"})
-		for example_properties_frozen_set in self.memorised_example_properties:
-			example_properties_set = set(example_properties_frozen_set).copy()
-			example_properties_set.add(self.query_pseudo_symbol)
-			memorized_properties_per_example.append(example_properties_set)
+		# the properties that are equivalent to, or implied by, the query pseudo symbol, are read from the incrementally built formal context
+		query_related_chars = self.episodic_fca_context.get_equivalent_and_implied_attributes(self.query_pseudo_symbol,
+																							  ignored_attributes={"padded_property"})
 
-		episodic_fca_structure_of_chars = create_fca_structure(memorized_properties_per_example, is_list=True)
+		return query_related_attributes_to_query_representation(query_related_chars)
 
-		query_interpretation_char_weights = utilise_fca_induced_relations_to_query_representation(
-			episodic_fca_structure_of_chars, query_pseudo_symbol=self.query_pseudo_symbol, padded_property="padded_property")
+	# -------- Batched Teacher and Student Functions (many games of the same query, simulated in lockstep)
 
-		if self.query_pseudo_symbol in query_interpretation_char_weights:
-			del query_interpretation_char_weights[self.query_pseudo_symbol]
+	def prepare_batch_datastructures(self):
+		# Boolean matrix of object groups (rows) and the properties (columns) of their objects
+		self.object_group_property_incidence = np.zeros((len(self.object_group_ID_to_property_mask), len(self.property_vocabulary)), dtype=bool)
+		for object_group_ID, object_group_properties in self.object_group_ID_to_object_properties.items():
+			self.object_group_property_incidence[object_group_ID, list(object_group_properties)] = True
+		self.object_to_object_group_ID_array = np.zeros(len(self.object_vocabulary), dtype=np.int64)
+		for object_ID, object_group_ID in self.object_to_object_group_ID.items():
+			self.object_to_object_group_ID_array[object_ID] = object_group_ID
 
-		return query_interpretation_char_weights
+	def count_objects_per_object_group(self, objects_mask=None):
+		'''
+		:param objects_mask: a set of objects, as a bitmask over the object IDs (if None, all objects are counted)
+		:return: array with the number of the given objects that belong to each object group
+		'''
+		object_counts = np.zeros(len(self.object_group_ID_to_objects), dtype=np.int64)
+		for object_group_ID, object_group_objects in self.object_group_ID_to_objects.items():
+			if objects_mask is None:
+				object_counts[object_group_ID] = len(object_group_objects)
+			else:
+				object_counts[object_group_ID] = count_bits(self.object_group_ID_to_object_mask[object_group_ID] & objects_mask)
+		return object_counts
+
+	def reset_as_batch_teacher(self, query_property, teacher_policy, random_seeds):
+		'''
+		Prepares the teacher for teaching the same query in many games at once, one game per random seed.
+		Every game draws its random numbers from its own generator, in the same way as select_next_teaching_example does,
+		so every game results to the same examples as if it was played on its own (after reset_as_teacher and set_random_seed).
+		:return: whether the teacher can give any examples for this query (in all games)
+		'''
+		teacher_policy_accepted_values = ["random", "property-based"]
+
+		if teacher_policy.lower() not in teacher_policy_accepted_values:
+			raise ValueError("Wrong teacher policy provided: " + teacher_policy)
+
+		self.teacher_policy = teacher_policy
+		prepared_teacher = self.get_prepared_teacher(query_property, teacher_policy)
+		num_games = len(random_seeds)
+
+		self.batch_random_generators = [random.Random(random_seed) for random_seed in random_seeds]
+		self.example_group_comparisons = prepared_teacher["example_group_comparisons"]
+		self.example_group_comparison_scores = prepared_teacher["example_group_comparison_scores"]
+		self.batch_example_group_comparison_sampler = BatchedWeightedIndexSampler(prepared_teacher["example_group_comparison_sampler"], num_games)
+		self.batch_excluded_example_positions = [defaultdict(list) for _ in range(num_games)]
+		self.batch_num_examples_in_pool = np.full(num_games, prepared_teacher["num_examples_in_pool"], dtype=np.int64)
+
+		# the teacher memorises one episode per unclear example, and it has no semantic memory
+		self.batch_episodic_memory_sizes = np.zeros(num_games, dtype=np.int64)
+		self.batch_semantic_memory_sizes = np.zeros(num_games, dtype=np.int64)
+
+		return prepared_teacher["num_examples_in_pool"] > 0
+
+	def select_next_teaching_examples(self, games):
+		'''
+		:param games: array of the indices of the games that need a new example (and have examples left in their pools)
+		:return: two arrays, with the object IDs (of this agent) of the relevant and of the irrelevant object of each game's example
+		'''
+		uniform_random_numbers = [self.batch_random_generators[game].random() for game in games]
+		group_comparison_indices = self.batch_example_group_comparison_sampler.sample(games, uniform_random_numbers)
+
+		example_positions = np.zeros(len(games), dtype=np.int64)
+		relevant_objects = np.zeros(len(games), dtype=np.int64)
+		irrelevant_objects = np.zeros(len(games), dtype=np.int64)
+		for i, (game, group_comparison_index) in enumerate(zip(games.tolist(), group_comparison_indices.tolist())):
+			example_position, example = self.select_remaining_example_of_group_comparison(group_comparison_index,
+																						   self.batch_excluded_example_positions[game],
+																						   self.batch_random_generators[game])
+			example_positions[i] = example_position
+			relevant_objects[i], irrelevant_objects[i] = example
+
+		self.batch_teaching_example_episode_memory = dict()
+		self.batch_teaching_example_episode_memory["games"] = games
+		self.batch_teaching_example_episode_memory["group_comparison_indices"] = group_comparison_indices
+		self.batch_teaching_example_episode_memory["example_positions"] = example_positions
+
+		return relevant_objects, irrelevant_objects
+
+	def comprehend_students_responses_on_examples(self, successfully_comprehended):
+		'''
+		:param successfully_comprehended: Boolean array, with the student's response on the last example of each game
+		'''
+		unclear = ~np.asarray(successfully_comprehended)
+		games = self.batch_teaching_example_episode_memory["games"][unclear]
+		group_comparison_indices = self.batch_teaching_example_episode_memory["group_comparison_indices"][unclear]
+		example_positions = self.batch_teaching_example_episode_memory["example_positions"][unclear]
+
+		# unclear examples are removed from the pools of their games, as in comprehend_students_response_on_example
+		group_comparison_weights = np.zeros(len(games), dtype=np.float64)
+		for i, (game, group_comparison_index, example_position) in enumerate(zip(games.tolist(), group_comparison_indices.tolist(),
+																				  example_positions.tolist())):
+			excluded_example_positions = self.batch_excluded_example_positions[game][group_comparison_index]
+			bisect.insort(excluded_example_positions, example_position)
+			group_comparison_weights[i] = self.get_remaining_group_comparison_weight(group_comparison_index, excluded_example_positions)
+		self.batch_example_group_comparison_sampler.update(games, group_comparison_indices, group_comparison_weights)
+		self.batch_num_examples_in_pool[games] -= 1
+		self.batch_episodic_memory_sizes[games] += 1
+
+	def reset_as_batch_student(self, student_policy, num_games):
+		'''
+		Prepares the student for learning the same query in many games at once.
+		Only the frequency-based student can be simulated this way, since its memory is a score per property.
+		'''
+		self.student_policy = student_policy.lower()
+		if self.student_policy != "frequency-based":
+			raise ValueError("Only the 'frequency-based' student policy can be simulated in batches, got: " + student_policy)
+
+		if self.object_group_property_incidence is None:
+			self.prepare_batch_datastructures()
+
+		# the scores of all properties in all games, and whether each property has been scored (is kept in the semantic memory)
+		self.batch_property_scores = np.zeros((num_games, len(self.property_vocabulary)), dtype=np.int64)
+		self.batch_scored_properties = np.zeros((num_games, len(self.property_vocabulary)), dtype=bool)
+
+		self.batch_episodic_memory_sizes = np.zeros(num_games, dtype=np.int64)
+		self.batch_semantic_memory_sizes = np.zeros(num_games, dtype=np.int64)
+		# the version of the student's state in every game (see reset_as_student)
+		self.batch_student_state_versions = np.zeros(num_games, dtype=np.int64)
+
+	def learn_from_examples(self, games, relevant_objects, irrelevant_objects):
+		'''
+		:param games: array of the indices of the games that the examples belong to (one example per game)
+		:param relevant_objects: array of the object IDs (of this agent) of the relevant objects of the examples
+		:param irrelevant_objects: array of the object IDs (of this agent) of the irrelevant objects of the examples
+		:return: Boolean array, whether each example was clear
+		'''
+		relevant_object_properties = self.object_group_property_incidence[self.object_to_object_group_ID_array[relevant_objects]]
+		irrelevant_object_properties = self.object_group_property_incidence[self.object_to_object_group_ID_array[irrelevant_objects]]
+
+		example_positive_property_sets = relevant_object_properties & ~irrelevant_object_properties
+		example_common_property_sets = relevant_object_properties & irrelevant_object_properties
+
+		examples_are_clear = example_positive_property_sets.any(axis=1)
+		example_positive_property_sets = example_positive_property_sets[examples_are_clear]
+		example_common_property_sets = example_common_property_sets[examples_are_clear]
+		games = games[examples_are_clear]
+
+		# reinforce the positive properties and weaken the common properties of every (clear) example, as in learn_from_example
+		self.batch_property_scores[games] += example_positive_property_sets.astype(np.int64) - example_common_property_sets
+		self.batch_scored_properties[games] |= example_positive_property_sets | example_common_property_sets
+		self.batch_semantic_memory_sizes[games] = self.batch_scored_properties[games].sum(axis=1)
+		self.batch_student_state_versions[games] += 1
+
+		return examples_are_clear
+
+	def get_batch_query_result_groups(self, games):
+		'''
+		The query results of a game are the objects of all groups with at least one positively scored property, ranked by the
+		sum of the scores of their properties (as in rank_query_object_groups)
+		:param games: array of game indices
+		:return: matrix of games (rows) and the IDs of their ranked object groups (columns), and the Boolean matrix of whether each
+		one of them is part of the game's query results (all candidate groups precede the rest)
+		'''
+		property_scores = self.batch_property_scores[games]
+		object_group_property_incidence = self.object_group_property_incidence.T.astype(np.int64)
+		object_group_scores = property_scores @ object_group_property_incidence
+		candidate_object_groups = ((property_scores > 0).astype(np.int64) @ object_group_property_incidence) > 0
+
+		# groups are ranked by being candidates, by descending score, and by ascending ID (the last key is the primary one)
+		object_group_IDs = np.broadcast_to(np.arange(object_group_scores.shape[1]), object_group_scores.shape)
+		ranked_object_group_IDs = np.lexsort((object_group_IDs, -object_group_scores, ~candidate_object_groups), axis=-1)
+		ranked_candidate_object_groups = np.take_along_axis(candidate_object_groups, ranked_object_group_IDs, axis=-1)
+		return ranked_object_group_IDs, ranked_candidate_object_groups
 
 	# ------------------ Memory Use Evaluation Functions :
 
@@ -1,10 +1,12 @@
 import os
 import numpy as np
 import pickle
+import hashlib
+import random
+import rdflib
 from rdflib import Graph, RDF, URIRef, OWL
 from collections import defaultdict
 from itertools import chain, combinations
-import concepts as fca
 
 
 
@@ -30,9 +32,6 @@ def ontology_prefix_to_namespace_str(prefix):
 def get_all_ontology_prefixes():
 	return ["cmt", "conference", "edas", "ekaw", "iasted", "sigkdd", "confof"]
 
-def concepts_library_symmetric_relations():
-	return {"equivalent", "orthogonal", "incompatible", "subcontrary", "complement"}
-
 def get_all_prefix_pairs():
 	return ["cmt-conference", "cmt-confof", "cmt-edas", "cmt-ekaw", "cmt-iasted",
 			 "cmt-sigkdd", "conference-confof", "conference-edas", "conference-ekaw",
@@ -41,162 +40,469 @@ def get_all_prefix_pairs():
 			 "ekaw-iasted", "ekaw-sigkdd", "iasted-sigkdd"]
 
 
-def aggregate_statistics_of_dictionary_of_list_of_values(input_dict):
-	av_dict = {}
-	std_dict = {}
-	for key in input_dict:
-		object = input_dict[key]
-		if isinstance(object, list) and isinstance(object[0], (int, float)):
-			np_object = np.asarray(object)
-			av_dict[key] = np.mean(np_object)
-			std_dict[key] = np.std(np_object)
-		else:
-			av_dict[key] = object
-	return av_dict, std_dict
-
-
-def append_to_list_from_one_dictionary_to_other(source_dict, target_dict, keys_to_append_list=[]):
-	for key in keys_to_append_list:
-		# we make sure that we don't have lists of lists, but everything is kept in the same original 1-d list
-		if isinstance(source_dict[key], list):
-			target_dict[key] += source_dict[key]
-		else:
-			target_dict[key].append(source_dict[key])
-
-def powerset(iterable):
-	# this function is from https://stackoverflow.com/questions/1482308/how-to-get-all-subsets-of-a-set-powerset
-	"powerset([1,2,3]) --> () (1,) (2,) (3,) (1,2) (1,3) (2,3) (1,2,3)"
-	s = list(iterable)
-	return chain.from_iterable(combinations(s, r) for r in range(len(s) + 1))
+# in-process registry of already parsed ontologies, so that every ontology file is parsed (or loaded) at most once per run.
+# keys are (absolute file path, modification time), values are rdflib.Graph instances that are shared and treated as read-only
+parsed_ontologies_registry = {}
 
+def get_file_content_hash(file_path):
+	file_hash = hashlib.sha256()
+	with open(file_path, "rb") as file:
+		for chunk in iter(lambda: file.read(1 << 20), b""):
+			file_hash.update(chunk)
+	return file_hash.hexdigest()
 
-def create_fca_structure(objects_characteristics_dict, is_list=False, object_prefix=""):
+def load_ontology_graph(graph_path, cache_dir=None):
 	'''
-	:param objects_characteristics_dict: a dictionary of objects (keys) and their characteristics (value is an iterable instance)
-	:param is_list: A boolean indicating if objects_characteristics_dict is a list instead of a dictionary,
-			in which case we don't cate about the object's names
-	:return: a generated concepts (fca) instance
+	Returns the parsed rdflib graph of an ontology file. Every file is parsed at most once per process,
+	and if a cache directory is provided (it is opt-in), a pickled snapshot of the parsed graph is stored there and is loaded in place
+	of the original file. Snapshots are not smaller than the ontology files, they only save the parsing time, and since they are
+	unpickled, the cache directory has to be trusted.
+	Snapshots are keyed by the file's absolute path, and are only used if the file's modification time and size,
+	or (if those changed) its content hash, are the same as when the snapshot was written.
+	:param graph_path: path to the ontology file (e.g. RDF/XML)
+	:param cache_dir: (optional) directory where the parsed ontology snapshots are saved
+	:return: an rdflib.Graph instance, that is shared among all callers and should not be modified
 	'''
-	# gather all existing characteristics to a set
-	all_characteristics = set()
-	for object in objects_characteristics_dict:
-		if is_list:
-			object_properties = object
-		else:
-			object_properties = objects_characteristics_dict[object]
-			if isinstance(object_properties, frozenset):
-				object_properties = set(object_properties)
-		all_characteristics = all_characteristics.union(object_properties)
-
-	# create property to index lookup table
-	characteristic_to_index = {}
-	characteristic_labels = []
-	for i, characteristic in enumerate(all_characteristics):
-		characteristic_to_index[characteristic] = i
-		characteristic_labels.append(characteristic)
-
-	# create final object's list and the boolean table
-	bools = []
-	objects = []
-	false_boolean_characteristics_template = [False for _ in range(len(all_characteristics))]
-
-	for i, object in enumerate(objects_characteristics_dict):
-		if is_list:
-			object_name = object_prefix + str(i)
-			characteristics = object
+	absolute_path = os.path.abspath(graph_path)
+	file_stats = os.stat(absolute_path)
+	registry_key = (absolute_path, file_stats.st_mtime_ns)
+	if registry_key in parsed_ontologies_registry:
+		return parsed_ontologies_registry[registry_key]
+
+	snapshot_path = None
+	content_hash = None
+	graph = None
+	if cache_dir:
+		snapshot_name = hashlib.sha1(absolute_path.encode("utf-8")).hexdigest() + ".pickle"
+		snapshot_path = os.path.join(cache_dir, snapshot_name)
+		if os.path.isfile(snapshot_path):
+			try:
+				with open(snapshot_path, "rb") as snapshot_file:
+					snapshot = pickle.load(snapshot_file)
+			except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+				snapshot = None
+			# a snapshot is only valid for the same file content, and for the rdflib version that produced it
+			if snapshot is not None and snapshot["source_path"] == absolute_path and snapshot["rdflib_version"] == rdflib.__version__:
+				if snapshot["mtime_ns"] == file_stats.st_mtime_ns and snapshot["size"] == file_stats.st_size:
+					graph = snapshot["graph"]
+				else:
+					content_hash = get_file_content_hash(absolute_path)
+					if snapshot["content_hash"] == content_hash:
+						graph = snapshot["graph"]
+
+	if graph is None:
+		graph = Graph()
+		graph.parse(absolute_path)
+		if snapshot_path is not None:
+			if content_hash is None:
+				content_hash = get_file_content_hash(absolute_path)
+			snapshot = {"source_path": absolute_path, "mtime_ns": file_stats.st_mtime_ns, "size": file_stats.st_size,
+						"content_hash": content_hash, "rdflib_version": rdflib.__version__, "graph": graph}
+			os.makedirs(cache_dir, exist_ok=True)
+			# writing to a temporary file first, so that an interrupted run never leaves a corrupted snapshot behind
+			temporary_snapshot_path = snapshot_path + "." + str(os.getpid()) + ".tmp"
+			try:
+				with open(temporary_snapshot_path, "wb") as snapshot_file:
+					pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+				os.replace(temporary_snapshot_path, snapshot_path)
+			finally:
+				if os.path.exists(temporary_snapshot_path):
+					os.remove(temporary_snapshot_path)
+
+	parsed_ontologies_registry[registry_key] = graph
+	return graph
+
+
+class CheckpointStore:
+	'''
+	A durable store of completed units of work (key-value pairs), so that an interrupted run can be resumed by skipping them.
+	Records are appended to a single file after a header that describes the configuration they were computed with. Every record is
+	a pickled (key, size of the value) pair followed by the pickled value, and it is flushed and synced to the disk as soon as it is added.
+	Values are not kept in memory: opening an existing store only indexes the positions of its values (skipping over them),
+	and every value is read from the file when it is looked up. A partially written last record (e.g. after a crash) is discarded.
+	'''
+	def __init__(self, file_path, header):
+		'''
+		:param file_path: the path of the store's file, which is created if it does not exist
+		:param header: (picklable, comparable) description of the configuration. Existing records are only valid for the same header.
+		'''
+		self.file_path = file_path
+		# the (offset, size) of the value of every key in the file
+		self.value_positions = {}
+		valid_size = 0
+		if os.path.isfile(file_path):
+			file_size = os.path.getsize(file_path)
+			with open(file_path, "rb") as store_file:
+				try:
+					stored_header = pickle.load(store_file)
+					if stored_header != header:
+						raise ValueError("Checkpoint " + file_path + " was written by a run with a different configuration: " + str(stored_header))
+					valid_size = store_file.tell()
+					while True:
+						key, value_size = pickle.load(store_file)
+						value_offset = store_file.tell()
+						if value_offset + value_size > file_size:
+							break
+						store_file.seek(value_offset + value_size)
+						self.value_positions[key] = (value_offset, value_size)
+						valid_size = store_file.tell()
+				except (EOFError, pickle.UnpicklingError):
+					pass
+
+		os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+		self.store_file = open(file_path, "r+b" if valid_size > 0 else "w+b")
+		if valid_size > 0:
+			self.store_file.truncate(valid_size)
 		else:
-			object_name = object_prefix + str(object)
-			characteristics = objects_characteristics_dict[object]
-		objects.append(object_name)
+			pickle.dump(header, self.store_file, protocol=pickle.HIGHEST_PROTOCOL)
+			self.sync()
+
+	def __contains__(self, key):
+		return key in self.value_positions
+
+	def __len__(self):
+		return len(self.value_positions)
+
+	def get(self, key, default=None):
+		'''
+		:return: the value of the key, read from the file, or default if the key is not in the store
+		'''
+		if key not in self.value_positions:
+			return default
+		value_offset, value_size = self.value_positions[key]
+		self.store_file.seek(value_offset)
+		return pickle.loads(self.store_file.read(value_size))
+
+	def add(self, key, value):
+		value_bytes = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+		self.store_file.seek(0, os.SEEK_END)
+		pickle.dump((key, len(value_bytes)), self.store_file, protocol=pickle.HIGHEST_PROTOCOL)
+		value_offset = self.store_file.tell()
+		self.store_file.write(value_bytes)
+		self.sync()
+		self.value_positions[key] = (value_offset, len(value_bytes))
+
+	def sync(self):
+		self.store_file.flush()
+		os.fsync(self.store_file.fileno())
+
+	def close(self):
+		self.store_file.close()
+
+
+class URIVocabulary:
+	'''
+	Interns URIs into dense integer IDs (0, 1, 2, ...) in order of registration, so that data structures can be built over integers,
+	and URIs are only needed when communicating with other agents or reporting results.
+	'''
+	def __init__(self):
+		self.URI_to_ID = {}
+		self.ID_to_URI = []
 
-		if isinstance(characteristics, frozenset):
-			characteristics = set(characteristics)
+	def __len__(self):
+		return len(self.ID_to_URI)
 
-		boolean_characteristics = false_boolean_characteristics_template[:]
-		for characteristic in characteristics:
-			characteristic_index = characteristic_to_index[characteristic]
-			boolean_characteristics[characteristic_index] = True
-		bools.append(tuple(boolean_characteristics))
+	def __contains__(self, URI):
+		return URI in self.URI_to_ID
 
-	fca_structure = fca.Context(objects, characteristic_labels, bools)
+	def register(self, URI):
+		'''
+		:param URI: the URI to intern
+		:return: the ID of the URI, registering it first if it is not known yet
+		'''
+		ID = self.URI_to_ID.get(URI)
+		if ID is None:
+			ID = len(self.ID_to_URI)
+			self.URI_to_ID[URI] = ID
+			self.ID_to_URI.append(URI)
+		return ID
 
-	return fca_structure
+	def get_ID(self, URI, default=None):
+		return self.URI_to_ID.get(URI, default)
 
-def get_fca_induced_relations(fca_structure, padded_property=None):
-	'''
-	This function get a fca structure, computes the relations between the attributes and returns them
-	:param fca_structure: the provided fca structure
-	:return:
-	dictionary 1: same_namespace_relations. The dictionary keys are the relation type, values are lists that contains lists of 2 concepts
-	dictionary 2: cross_namespace_relations. The dictionary keys are the relation type, values are lists that contains lists of 2 concepts
-	set: all concepts that appear in the relations
-	'''
-	cross_namespace_relations = defaultdict(list)
-	same_namespace_relations = defaultdict(list)
-	all_involved_attributes = set()
+	def get_URI(self, ID):
+		return self.ID_to_URI[ID]
 
-	symbol_translation_dict = defaultdict(lambda: defaultdict(set))
-	symmetric_relations = concepts_library_symmetric_relations()
-
-	for i, relation in enumerate(fca_structure.relations()):
-		attribute_A, relation_type, attribute_B = str(relation).split()
-		# In some cases we have added an artificial property named padded_property, which we want to ignore
-		# This is needed for inferring relations between object properties
-		if padded_property is not None and (attribute_A == "padded_property" or attribute_B == "padded_property"):
-			continue
-		namespace_A = attribute_A.split("#")[0]
-		namespace_B = attribute_B.split("#")[0]
-		relation_tuple = (attribute_A, attribute_B)
-		all_involved_attributes.update([attribute_A, attribute_B])
-		symbol_translation_dict[attribute_A][relation_type].add(attribute_B)
-		if relation_type in symmetric_relations:
-			symbol_translation_dict[attribute_B][relation_type].add(attribute_A)
-		# cross namespaces relations
-		if namespace_A != namespace_B:
-			cross_namespace_relations[relation_type].append(relation_tuple)
-		else:
-			same_namespace_relations[relation_type].append(relation_tuple)
-	return same_namespace_relations, cross_namespace_relations, all_involved_attributes, symbol_translation_dict
+	def get_URIs(self, IDs):
+		return {self.ID_to_URI[ID] for ID in IDs}
 
 
+class WeightedIndexSampler:
+	'''
+	Samples indices (0, 1, ..., n-1) proportionally to their non negative weights.
+	Sampling, as well as changing the weight of an index (e.g. setting it to 0, to remove it), take O(log n) time.
+	The weights are kept in the leaves of a binary tree, the inner nodes of which hold the sums of the weights of their children.
+	'''
+	def __init__(self, weights):
+		self.size = len(weights)
+		self.capacity = 1
+		while self.capacity < self.size:
+			self.capacity *= 2
+		# node 1 is the root, and the children of node i are the nodes 2i and 2i+1. Leaves start at node "capacity".
+		self.tree = [0] * (2 * self.capacity)
+		self.tree[self.capacity:self.capacity + self.size] = weights
+		for node in range(self.capacity - 1, 0, -1):
+			self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+
+	def __len__(self):
+		return self.size
+
+	def copy(self):
+		sampler_copy = WeightedIndexSampler.__new__(WeightedIndexSampler)
+		sampler_copy.size = self.size
+		sampler_copy.capacity = self.capacity
+		sampler_copy.tree = self.tree[:]
+		return sampler_copy
+
+	def get_total_weight(self):
+		return self.tree[1]
+
+	def get_weight(self, index):
+		return self.tree[self.capacity + index]
+
+	def update(self, index, weight):
+		node = self.capacity + index
+		self.tree[node] = weight
+		node //= 2
+		# sums are recomputed from the children (instead of adding the difference), so that no rounding errors are accumulated
+		while node > 0:
+			self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+			node //= 2
+
+	def sample(self, random_generator=random):
+		'''
+		:param random_generator: the source of randomness, providing a random() method (e.g. the random module, or a random.Random instance)
+		:return: the sampled index, or None if all weights are 0
+		'''
+		if self.tree[1] <= 0:
+			return None
+		threshold = random_generator.random() * self.tree[1]
+		node = 1
+		while node < self.capacity:
+			left_child = 2 * node
+			# we never descend to a sub-tree with no weight, even if rounding errors would point there
+			if threshold < self.tree[left_child] or self.tree[left_child + 1] <= 0:
+				node = left_child
+			else:
+				threshold -= self.tree[left_child]
+				node = left_child + 1
+		return node - self.capacity
 
-def retrieve_all_related_symbols_recursively(symbol_translation_dict, current_symbol, relation_type, searched_symbols, symbols_to_further_search, related_symbols):
-	searched_symbols.add(current_symbol)
-
-	if relation_type not in symbol_translation_dict[current_symbol]:
-		return related_symbols
 
-	related_symbols.update(symbol_translation_dict[current_symbol][relation_type])
-	symbols_to_further_search.update( symbol_translation_dict[current_symbol][relation_type] - searched_symbols )
+class BatchedWeightedIndexSampler:
+	'''
+	Independent copies of a WeightedIndexSampler (one per game, when many games are simulated in lockstep),
+	the trees of which are kept in the rows of a NumPy array, so that all copies are sampled and updated with vectorised operations.
+	Given the same uniform random numbers, every copy samples exactly the same indices as a WeightedIndexSampler with the same weights.
+	'''
+	def __init__(self, sampler, num_copies):
+		self.size = sampler.size
+		self.capacity = sampler.capacity
+		self.tree = np.tile(np.asarray(sampler.tree, dtype=np.float64), (num_copies, 1))
+
+	def get_total_weights(self, copies):
+		return self.tree[copies, 1]
+
+	def update(self, copies, indices, weights):
+		'''
+		:param copies: array of copy indices (each copy at most once)
+		:param indices: array of the indices to update, one per copy
+		:param weights: array of the new weights, one per copy
+		'''
+		nodes = self.capacity + np.asarray(indices)
+		self.tree[copies, nodes] = weights
+		nodes //= 2
+		while len(nodes) > 0 and nodes[0] > 0:
+			self.tree[copies, nodes] = self.tree[copies, 2 * nodes] + self.tree[copies, 2 * nodes + 1]
+			nodes //= 2
+
+	def sample(self, copies, uniform_random_numbers):
+		'''
+		:param copies: array of copy indices, with a positive total weight
+		:param uniform_random_numbers: array of random numbers in [0, 1), one per copy
+		:return: array of the sampled indices, one per copy
+		'''
+		thresholds = np.asarray(uniform_random_numbers, dtype=np.float64) * self.tree[copies, 1]
+		nodes = np.ones(len(copies), dtype=np.int64)
+		while len(nodes) > 0 and nodes[0] < self.capacity:
+			left_children = 2 * nodes
+			left_weights = self.tree[copies, left_children]
+			# as in WeightedIndexSampler.sample, we never descend to a sub-tree with no weight
+			descend_left = (thresholds < left_weights) | (self.tree[copies, left_children + 1] <= 0)
+			thresholds = np.where(descend_left, thresholds, thresholds - left_weights)
+			nodes = np.where(descend_left, left_children, left_children + 1)
+		return nodes - self.capacity
+
+
+def derive_seed(master_seed, *keys):
+	'''
+	Derives a seed for a random number generator from a master seed and some keys (e.g. an ontology pair),
+	independently of the order in which seeds are requested, and of python's (randomised) string hashing.
+	:param master_seed: an integer, or None for non reproducible (random) seeds
+	:return: an integer seed, or None if master_seed is None
+	'''
+	if master_seed is None:
+		return None
+	seed_material = ":".join(str(key) for key in (master_seed,) + keys)
+	return int.from_bytes(hashlib.sha256(seed_material.encode("utf-8")).digest()[:8], "big")
 
-	if len(symbols_to_further_search) == 0:
-		return related_symbols
+def IDs_to_bitmask(IDs):
+	'''
+	:param IDs: an iterable of (small, non negative) integer IDs
+	:return: an integer, the bit of which in position ID is set, for every ID
+	'''
+	bitmask = 0
+	for ID in IDs:
+		bitmask |= 1 << ID
+	return bitmask
 
-	next_symbol = symbols_to_further_search.pop()
-	return retrieve_all_related_symbols_recursively(symbol_translation_dict, next_symbol, relation_type, searched_symbols, symbols_to_further_search, related_symbols)
+def count_bits(bitmask):
+	'''
+	:param bitmask: an integer representing a set of IDs (as returned by IDs_to_bitmask)
+	:return: the number of IDs in the set (population count)
+	'''
+	return bitmask.bit_count()
 
-def utilise_fca_induced_relations_to_query_representation(fca_structure, query_pseudo_symbol, padded_property=None):
+def bitmask_to_IDs(bitmask):
 	'''
-	This function applies FCA on the episodic memory, in order to infer which characteristics are related to this query.
-	Then, it provides a weight or score to each property, according to their relation with the query symbol.
-	Finally, it returns a dictionary of property-weight values.
+	:param bitmask: an integer representing a set of IDs (as returned by IDs_to_bitmask)
+	:return: list of the IDs whose bits are set, in increasing order
 	'''
+	IDs = []
+	while bitmask:
+		lowest_bit = bitmask & -bitmask
+		IDs.append(lowest_bit.bit_length() - 1)
+		bitmask ^= lowest_bit
+	return IDs
 
-	# let's start by seeing in which relations the communication symbol is involved
-	_, _, _, symbol_translation_dict = get_fca_induced_relations(fca_structure, padded_property=padded_property)
 
-	# keys we will use: 	"incompatible", "implication", "subcontrary", "orthogonal", "equivalent"
-	query_related_chars={}
+class ColumnarResultStore:
+	'''
+	Stores the values of some metrics for many rows (e.g. one row per game), in one preallocated float64 array
+	of shape (capacity, *row_shape, number of metrics), instead of (nested dictionaries of) lists of python numbers.
+	Missing values (e.g. the metrics of a game that could not be executed) are NaN, and they are ignored by get_mean and get_std.
+	The array doubles its capacity whenever more rows are added than the ones it was allocated for.
+
+	On-disk format (see save and load_columnar_result_store): a numpy .npz archive with the arrays
+		"metrics": the metric names (strings), in the order of the last axis of "values",
+		"values": float64 array of shape (number of rows, *row_shape, number of metrics),
+	and any index arrays of the row axes given to save, e.g. "steps" for the step-wise results of games.
+	'''
+	def __init__(self, metric_names, row_shape=(), capacity=0):
+		self.metric_names = list(metric_names)
+		self.metric_to_index = {metric: i for i, metric in enumerate(self.metric_names)}
+		self.row_shape = tuple(row_shape)
+		self.values = np.full((capacity,) + self.row_shape + (len(self.metric_names),), np.nan)
+		self.num_rows = 0
+
+	def __len__(self):
+		return self.num_rows
+
+	def reserve(self, num_rows):
+		'''
+		Makes sure that num_rows more rows can be added without reallocating the array
+		'''
+		required_capacity = self.num_rows + num_rows
+		if required_capacity > len(self.values):
+			values = np.full((max(required_capacity, 2 * len(self.values)),) + self.values.shape[1:], np.nan)
+			values[:self.num_rows] = self.values[:self.num_rows]
+			self.values = values
+
+	def add_row(self, row_values):
+		'''
+		:param row_values: array of shape (*row_shape, number of metrics), or dictionary from metric names to values (of shape row_shape),
+		where the metrics that are not in the dictionary are missing
+		'''
+		self.reserve(1)
+		row = self.values[self.num_rows]
+		if isinstance(row_values, dict):
+			for metric in row_values:
+				row[..., self.metric_to_index[metric]] = row_values[metric]
+		else:
+			row[...] = row_values
+		self.num_rows += 1
+
+	def extend(self, other_store):
+		'''
+		Appends all rows of another store, with the same metrics and row shape
+		'''
+		if other_store.metric_names != self.metric_names or other_store.row_shape != self.row_shape:
+			raise ValueError("Cannot merge result stores of different metrics or row shapes!")
+		self.reserve(other_store.num_rows)
+		self.values[self.num_rows: self.num_rows + other_store.num_rows] = other_store.get_values()
+		self.num_rows += other_store.num_rows
+
+	def get_values(self, metric=None):
+		'''
+		:return: (a view of) the values of all rows, of shape (number of rows, *row_shape, number of metrics), or (number of rows, *row_shape) if a metric is given
+		'''
+		values = self.values[:self.num_rows]
+		if metric is None:
+			return values
+		return values[..., self.metric_to_index[metric]]
+
+	def get_mean(self):
+		'''
+		:return: array of shape (*row_shape, number of metrics), with the mean of every metric over the rows, ignoring missing values
+		(the rows are summed in order, so the means are identical to summing the rows one by one)
+		'''
+		values = self.get_values()
+		is_present = ~np.isnan(values)
+		with np.errstate(invalid="ignore", divide="ignore"):
+			return np.where(is_present, values, 0).sum(axis=0) / is_present.sum(axis=0)
+
+	def get_std(self):
+		'''
+		:return: array of shape (*row_shape, number of metrics), with the (population) standard deviation of every metric over the rows, ignoring missing values
+		'''
+		values = self.get_values()
+		is_present = ~np.isnan(values)
+		squared_deviations = np.where(is_present, values - self.get_mean(), 0) ** 2
+		with np.errstate(invalid="ignore", divide="ignore"):
+			return np.sqrt(squared_deviations.sum(axis=0) / is_present.sum(axis=0))
+
+	def get_mean_and_std_dicts(self):
+		'''
+		:return: two dictionaries, from the metric names to their mean and standard deviation (for stores of scalar rows)
+		'''
+		means = self.get_mean().tolist()
+		stds = self.get_std().tolist()
+		return dict(zip(self.metric_names, means)), dict(zip(self.metric_names, stds))
+
+	def save(self, file_path, **index_arrays):
+		'''
+		Writes the store in its on-disk format (a compressed .npz archive)
+		:param index_arrays: (optional) named arrays that index the row axes, e.g. steps=...
+		'''
+		np.savez_compressed(file_path, metrics=np.array(self.metric_names), values=self.get_values(), **index_arrays)
+
+
+def load_columnar_result_store(file_path):
+	'''
+	:return: the store written by ColumnarResultStore.save, and a dictionary with its index arrays
+	'''
+	with np.load(file_path, allow_pickle=False) as archive:
+		values = archive["values"]
+		result_store = ColumnarResultStore(archive["metrics"].tolist(), row_shape=values.shape[1:-1], capacity=len(values))
+		result_store.values[:] = values
+		result_store.num_rows = len(values)
+		index_arrays = {name: archive[name] for name in archive.files if name not in ("metrics", "values")}
+	return result_store, index_arrays
 
-	query_related_chars["equivalent"] = retrieve_all_related_symbols_recursively(symbol_translation_dict, current_symbol=query_pseudo_symbol,
-				relation_type="equivalent", searched_symbols=set(), symbols_to_further_search=set(), related_symbols=set())
 
-	query_related_chars["implication"] = retrieve_all_related_symbols_recursively(symbol_translation_dict, current_symbol=query_pseudo_symbol,
-				relation_type="implication", searched_symbols=set(), symbols_to_further_search=query_related_chars["equivalent"], related_symbols=set())
+def powerset(iterable):
+	# this function is from https://stackoverflow.com/questions/1482308/how-to-get-all-subsets-of-a-set-powerset
+	"powerset([1,2,3]) --> () (1,) (2,) (3,) (1,2) (1,3) (2,3) (1,2,3)"
+	s = list(iterable)
+	return chain.from_iterable(combinations(s, r) for r in range(len(s) + 1))
 
-	# if something looks like both equivalent and implied, then we keep the equivalent relationship
-	query_related_chars["implication"] = query_related_chars["implication"] - query_related_chars["equivalent"]
 
+def query_related_attributes_to_query_representation(query_related_chars):
+	'''
+	:param query_related_chars: dictionary with the keys "equivalent" and "implication",
+			and values the sets of attributes that are equivalent to, or implied by, the query symbol
+	:return: a dictionary of property-weight values
+	'''
 	# provide scores to each interpreted property according to their relation type
 	scores = {"equivalent": 10, "implication": 5}
 
@@ -208,6 +514,79 @@ def utilise_fca_induced_relations_to_query_representation(fca_structure, query_p
 
 	return query_interpretation_char_weights
 
+def get_equivalent_and_implied_attributes_from_extents(query_attribute, attribute_extents, all_objects_extent, candidate_attributes=None):
+	'''
+	Finds the attributes that are equivalent to, or implied by, an attribute, by comparing attribute extents, represented as bitmasks over the objects.
+	Attribute B is equivalent to the query attribute Q if they have the same extent, and Q implies B if Q's extent is a proper subset of B's extent.
+	As in the concepts library, only contingent attributes (that some, but not all, objects have) are related to each other.
+	:param query_attribute: the attribute Q
+	:param attribute_extents: dictionary of attributes (keys) and their extent bitmasks (values)
+	:param all_objects_extent: the bitmask of all the objects
+	:param candidate_attributes: (optional) the attributes to consider, by default all attributes
+	:return: a dictionary with the keys "equivalent" and "implication", and values sets of attributes
+	'''
+	query_related_chars = {"equivalent": set(), "implication": set()}
+	query_extent = attribute_extents.get(query_attribute, 0)
+	if query_extent == 0 or query_extent == all_objects_extent:
+		return query_related_chars
+
+	if candidate_attributes is None:
+		candidate_attributes = attribute_extents.keys()
+	for attribute in candidate_attributes:
+		if attribute == query_attribute:
+			continue
+		attribute_extent = attribute_extents[attribute]
+		if attribute_extent == all_objects_extent:
+			continue
+		if attribute_extent == query_extent:
+			query_related_chars["equivalent"].add(attribute)
+		elif attribute_extent & query_extent == query_extent:
+			query_related_chars["implication"].add(attribute)
+	return query_related_chars
+
+class IncrementalFormalContext:
+	'''
+	A formal context (objects described by sets of attributes) that is built by adding one object at a time.
+	It keeps the extent of every attribute as a bitmask over the objects, and the closure (the attributes that are shared
+	by all objects that have it) of a few tracked attributes, so that the attributes that are equivalent to, or implied by,
+	a tracked attribute can be found directly, without enumerating all the relations among attributes.
+	'''
+	def __init__(self, tracked_attributes=()):
+		self.num_objects = 0
+		self.attribute_extents = defaultdict(int)
+		# None stands for the closure of an attribute that no object has yet
+		self.tracked_attribute_closures = {attribute: None for attribute in tracked_attributes}
+
+	def add_object(self, attributes):
+		'''
+		:param attributes: the set of attributes of the new object
+		'''
+		attributes = set(attributes)
+		object_bit = 1 << self.num_objects
+		self.num_objects += 1
+		for attribute in attributes:
+			self.attribute_extents[attribute] |= object_bit
+		for tracked_attribute, closure in self.tracked_attribute_closures.items():
+			if tracked_attribute in attributes:
+				self.tracked_attribute_closures[tracked_attribute] = attributes if closure is None else closure & attributes
+
+	def get_attribute_closure(self, tracked_attribute):
+		closure = self.tracked_attribute_closures[tracked_attribute]
+		return set() if closure is None else closure
+
+	def get_equivalent_and_implied_attributes(self, tracked_attribute, ignored_attributes=()):
+		'''
+		:param tracked_attribute: one of the tracked attributes
+		:param ignored_attributes: attributes that should not be returned
+		:return: a dictionary with the keys "equivalent" and "implication", and values sets of attributes
+		'''
+		# every attribute that is equivalent to, or implied by the tracked attribute, belongs to its closure
+		candidate_attributes = self.get_attribute_closure(tracked_attribute) - set(ignored_attributes)
+		all_objects_extent = (1 << self.num_objects) - 1
+		return get_equivalent_and_implied_attributes_from_extents(tracked_attribute, self.attribute_extents, all_objects_extent,
+																  candidate_attributes=candidate_attributes)
+
+
 def load_ontology_alignments(ont_1_prefix, ont_2_prefix, dir_path):
 	'''
 	This function reads turtle files of GOLD aligned concepts across two ontologies, and returns two lists of tuples.
@@ -250,4 +629,5 @@ def load_ontology_alignments(ont_1_prefix, ont_2_prefix, dir_path):
 				ont_2_property = str(subject)
 			equivalent_properties.append((ont_1_property, ont_2_property))
 
-	return equivalent_classes, equivalent_properties
\ No newline at end of file
+	# the order of the triples in the graph depends on python's string hashing, so we sort the alignments for reproducibility
+	return sorted(equivalent_classes), sorted(equivalent_properties)
\ No newline at end of file
@@ -1,26 +1,25 @@
 from agent import *
 
-def	write_average_query_performance_to_tensorboard(tensorboard_writer, output_dict_step_wise, max_steps, step_size, other_dictionary_to_append=None):
-	num_successful_experiments = max(len(output_dict_step_wise[key][step_size]) for key in output_dict_step_wise)
-
-	average_values_per_step = defaultdict(dict)
-	for key in output_dict_step_wise:
-		step = step_size
-		while step <= max_steps:
-			average_value = sum(output_dict_step_wise[key][step]) / num_successful_experiments
-			average_values_per_step[key][step] = average_value
-			tensorboard_writer.add_scalar("Av_" + key, average_value, step)
-			if other_dictionary_to_append is not None:
-				other_dictionary_to_append[key][step] += output_dict_step_wise[key][step]
-			step += step_size
-
-	return average_values_per_step, other_dictionary_to_append
+def	write_average_query_performance_to_tensorboard(tensorboard_writer, step_wise_results, recording_steps, max_steps):
+	'''
+	:param step_wise_results: ColumnarResultStore with the step-wise metrics of games, recorded at recording_steps
+	:return: array of shape (number of recording steps, number of metrics), with the average value of every metric per recording step
+	'''
+	average_values_per_step = step_wise_results.get_mean()
+	for i, metric in enumerate(step_wise_results.metric_names):
+		for step_index, step in enumerate(recording_steps.tolist()):
+			if step <= max_steps:
+				tensorboard_writer.add_scalar("Av_" + metric, float(average_values_per_step[step_index, i]), step)
+
+	return average_values_per_step
 
 def format_average_query_performance_in_str(av_stats_dict, std_stats_dict=None, is_single_query=False):
 
 	# simply using new variables for "avoiding" visual overload, using all the dictionaries
 	av_precision = av_stats_dict["precision"]
 	av_recall = av_stats_dict["recall"]
+	av_average_precision = av_stats_dict["average_precision"]
+	av_r_precision = av_stats_dict["r_precision"]
 	av_total_steps = av_stats_dict["total_steps"]
 	av_query_result_size = av_stats_dict["query_result_size"]
 	av_episode_generation_deadend = av_stats_dict["episode_generation_deadend"]
@@ -42,12 +41,14 @@ def format_average_query_performance_in_str(av_stats_dict, std_stats_dict=None,
 
 	# finally, we report more detailed performance measures, and we also add their standard deviations in parenthesis, if they are provided
 	if std_stats_dict is None:
-		output_str += f"Pre: {av_precision:04.2}, Rec: {av_recall:04.2}, #Steps: {av_total_steps:04.2}, #Results: {av_query_result_size:07.2}, "
+		output_str += f"Pre: {av_precision:04.2}, Rec: {av_recall:04.2}, AP: {av_average_precision:04.2}, R-Pre: {av_r_precision:04.2}, #Steps: {av_total_steps:04.2}, #Results: {av_query_result_size:07.2}, "
 		output_str += f"Teach_Ep_Mem: {av_teacher_ep_mem:04.2}, Teach_Work_Mem: {av_teacher_sem_mem:04.2}, Stud_Ep_Mem {av_student_ep_mem:04.2}, Stud_Work_Mem {av_student_sem_mem:04.2}"
 
 	else:
 		std_precision = std_stats_dict["precision"]
 		std_recall = std_stats_dict["recall"]
+		std_average_precision = std_stats_dict["average_precision"]
+		std_r_precision = std_stats_dict["r_precision"]
 		std_total_steps = std_stats_dict["total_steps"]
 		std_query_result_size = std_stats_dict["query_result_size"]
 
@@ -57,6 +58,7 @@ def format_average_query_performance_in_str(av_stats_dict, std_stats_dict=None,
 		std_student_sem_mem = std_stats_dict["students_sem_mem_size"]
 
 		output_str += f"Pre: {av_precision:04.2} ({std_precision:04.2}), Rec: {av_recall:04.2} ({std_recall:04.2}), "
+		output_str += f"AP: {av_average_precision:04.2} ({std_average_precision:04.2}), R-Pre: {av_r_precision:04.2} ({std_r_precision:04.2}), "
 		output_str += f"#Steps: {av_total_steps:08.2} ({std_total_steps:08.2}), #Results: {av_query_result_size:04.2} ({std_query_result_size:04.2}), "
 		output_str += f"Teach_Ep_Mem: {av_teacher_ep_mem:04.2} ({std_teacher_ep_mem:04.2}), Teach_Work_Mem: {av_teacher_sem_mem:04.2} ({std_teacher_sem_mem:04.2}), "
 		output_str += f"Stud_Ep_Mem {av_student_ep_mem:04.2} ({std_student_ep_mem:04.2}), Stud_Work_Mem {av_student_sem_mem:04.2} ({std_student_sem_mem:04.2})"
@@ -1,24 +1,114 @@
 from experiment_utils import *
 import datetime
 from tensorboardX import SummaryWriter
-import pickle
 import os
 # from agents import Agent
 import shutil
+import itertools
+import copy
+from concurrent.futures import ProcessPoolExecutor
 
-def evaluate_students_understanding(student_agent, gt_results):
-	query_results = student_agent.get_student_query_results()
+# the metrics that are recorded every eval_every steps of a game (the last axis of the step-wise results of games)
+step_wise_metrics = ["0.running", "1.precision", "2.recall", "3.query_result_size", "4.teachers_ep_mem_size", "5.students_ep_mem_size",
+					 "6.teachers_sem_mem_size", "7.students_sem_mem_size", "8.average_precision", "9.r_precision"]
+# the metrics of the outcome of every repetition of a query experiment (which are missing, except for "completed", if it could not be executed)
+outcome_metrics = ["completed", "precision", "recall", "average_precision", "r_precision", "total_steps", "episode_generation_deadend",
+				   "query_result_size", "perfect_score", "teachers_ep_mem_size", "students_ep_mem_size", "teachers_sem_mem_size", "students_sem_mem_size"]
+
+# harmonic numbers H_0, H_1, ..., H_n (with H_0 = 0), which are extended when needed (see get_harmonic_numbers)
+harmonic_numbers = np.zeros(1)
+
+def get_recording_steps(max_steps, eval_every):
+	'''
+	:return: the steps at which the step-wise metrics of a game are recorded (every eval_every steps, until max_steps is reached)
+	'''
+	return np.arange(1, -(-max_steps // eval_every) + 1) * eval_every
+
+def get_harmonic_numbers(n):
+	'''
+	:return: array with (at least) the harmonic numbers H_0, H_1, ..., H_n
+	'''
+	global harmonic_numbers
+	if len(harmonic_numbers) <= n:
+		harmonic_numbers = np.concatenate(([0.0], np.cumsum(1 / np.arange(1, 2 * n + 1))))
+	return harmonic_numbers
+
+def get_ranked_query_result_metrics(ranked_object_group_sizes, ranked_object_group_gt_sizes, num_gt_results):
+	'''
+	Computes ranked retrieval metrics of query results that are ranked per object group. The objects of a group have the same score,
+	so the metrics are averaged over all orderings of the objects within each group (McSherry and Najork, 2008), in O(1) per group.
+	:param ranked_object_group_sizes: integer matrix of games (rows) and their ranked object groups (columns), with the number of objects in each group
+	:param ranked_object_group_gt_sizes: integer matrix, with the number of Ground Truth objects in each of the same groups
+	:param num_gt_results: the number of Ground Truth results
+	:return: arrays with the average precision, and with the precision at the first "num_gt_results" results (R-precision), of every game
+	'''
+	num_games, num_object_groups = ranked_object_group_sizes.shape
+	if num_games == 0 or num_object_groups == 0:
+		return np.zeros(num_games), np.zeros(num_games)
+
+	group_sizes = ranked_object_group_sizes.astype(np.float64)
+	group_gt_sizes = ranked_object_group_gt_sizes.astype(np.float64)
+	# the number of objects, and of Ground Truth objects, that are ranked before each group
+	preceding_results = np.cumsum(ranked_object_group_sizes, axis=1) - ranked_object_group_sizes
+	preceding_gt_results = np.cumsum(ranked_object_group_gt_sizes, axis=1) - ranked_object_group_gt_sizes
+
+	# the i-th object of a group is a GT object with probability r/n, and then the expected number of GT objects up to it is
+	# R + 1 + (i - 1)(r - 1)/(n - 1). Summing its precision over the n positions of the group, gives a closed form with harmonic numbers.
+	harmonic_numbers = get_harmonic_numbers(int((preceding_results[:, -1] + ranked_object_group_sizes[:, -1]).max()))
+	gt_probability = np.divide(group_gt_sizes, group_sizes, out=np.zeros_like(group_sizes), where=group_sizes > 0)
+	gt_increment = np.divide(group_gt_sizes - 1, group_sizes - 1, out=np.zeros_like(group_sizes), where=group_sizes > 1)
+	group_precision_sums = (preceding_gt_results + 1 - gt_increment * (preceding_results + 1)) * \
+						   (harmonic_numbers[preceding_results + ranked_object_group_sizes] - harmonic_numbers[preceding_results]) + \
+						   gt_increment * group_sizes
+	# (cumulative sums are used, as they are computed sequentially, independently of the number of columns)
+	average_precision = np.cumsum(gt_probability * group_precision_sums, axis=1)[:, -1] / num_gt_results
+
+	# the expected number of GT objects among the objects of each group that are ranked in the first "num_gt_results" results
+	group_sizes_within_cutoff = np.clip(num_gt_results - preceding_results, 0, ranked_object_group_sizes)
+	r_precision = np.cumsum(gt_probability * group_sizes_within_cutoff, axis=1)[:, -1] / num_gt_results
+
+	return average_precision, r_precision
+
+def evaluate_students_understanding(student_agent, query_ground_truth, evaluation_cache=None):
+	'''
+	The student's query results are evaluated per object group, in ranked order, by counting the Ground Truth objects of each group
+	(the bits of the intersection of the group's objects with the Ground Truth, both as bitmasks over the student's object IDs)
+	:param evaluation_cache: (optional) dictionary that keeps the evaluation of the student's latest state (of one game),
+	which is reused for as long as the student's state does not change
+	:return: precision, recall, number of query results, average precision, and R-precision
+	'''
+	if evaluation_cache is not None and evaluation_cache.get("student_state_version") == student_agent.student_state_version:
+		return evaluation_cache["evaluation"]
+
+	gt_results_mask = query_ground_truth["gt_student_query_results_mask"]
+	num_gt_results = query_ground_truth["num_gt_results"]
+
+	ranked_object_group_sizes = []
+	ranked_object_group_gt_sizes = []
+	for object_group_ID in student_agent.get_student_query_result_object_groups():
+		ranked_object_group_sizes.append(len(student_agent.object_group_ID_to_objects[object_group_ID]))
+		ranked_object_group_gt_sizes.append(count_bits(student_agent.object_group_ID_to_object_mask[object_group_ID] & gt_results_mask))
+
+	# object groups are disjoint
+	query_result_size = sum(ranked_object_group_sizes)
+	num_correct_results = sum(ranked_object_group_gt_sizes)
 
-	query_results_set = set(query_results)
 	# evaluate results with GT results
-	if len(query_results_set) != 0:
-		precision = len(gt_results.intersection(query_results_set)) / len(query_results_set)
+	if query_result_size != 0:
+		precision = num_correct_results / query_result_size
 	else:
 		precision = 0
-	recall = len(gt_results.intersection(query_results_set)) / len(gt_results)
-	return precision, recall, len(query_results_set)
+	recall = num_correct_results / num_gt_results
+
+	average_precision, r_precision = get_ranked_query_result_metrics(np.array([ranked_object_group_sizes], dtype=np.int64),
+																	 np.array([ranked_object_group_gt_sizes], dtype=np.int64), num_gt_results)
+	evaluation = (precision, recall, query_result_size, float(average_precision[0]), float(r_precision[0]))
+	if evaluation_cache is not None:
+		evaluation_cache["student_state_version"] = student_agent.student_state_version
+		evaluation_cache["evaluation"] = evaluation
+	return evaluation
 
-def teacher_student_one_query_one_interaction_cycle(teacher_agent, student_agent, gt_results_set, steps):
+def teacher_student_one_query_one_interaction_cycle(teacher_agent, student_agent, query_ground_truth, steps, evaluation_cache=None):
 	episode_generation_deadend = False
 	for step in range(steps):
 		teachers_output = teacher_agent.select_next_teaching_example()
@@ -29,51 +119,78 @@ def teacher_student_one_query_one_interaction_cycle(teacher_agent, student_agent
 		example_was_clear = student_agent.learn_from_example(example)
 		teacher_agent.comprehend_students_response_on_example(example_was_clear)
 
-	precision, recall, query_result_size = evaluate_students_understanding(student_agent, gt_results_set)
+	precision, recall, query_result_size, average_precision, r_precision = evaluate_students_understanding(student_agent, query_ground_truth,
+																										  evaluation_cache)
 
-	return step+1, precision, recall, query_result_size, episode_generation_deadend
+	return step+1, precision, recall, query_result_size, average_precision, r_precision, episode_generation_deadend
 
 
-def teacher_student_one_query_experiment(teacher_agent, student_agent, teacher_policy, student_policy,
-										 teacher_property, student_property, max_steps, eval_every, output_dict_step_wise):
+def get_query_ground_truth(teacher_agent, student_agent, teacher_property, student_property):
 	'''
-	Here, one selected agent is trying to query something specific (one query) from another agent.
-	The evaluation should take place on the query results in traditional IR terms.
+	Computes the query results of both agents, which are the same for all repetitions of a query experiment.
+	:return: a dictionary with the student's Ground Truth results, and the number of the teacher's, the student's and the common results
 	'''
-
 	# get Ground Truth results, by querying the student with the correct translation
-	gt_student_query_results = set()
-	for correct_result in student_agent.graph.subjects(RDF.type, URIRef(student_property)):
-		gt_student_query_results.add(correct_result)
-	num_gt_results = len(gt_student_query_results)
+	gt_student_query_results = student_agent.get_class_instances(URIRef(student_property))
 
-	teacher_query_results = set()
-	for correct_result in teacher_agent.graph.subjects(RDF.type, URIRef(teacher_property)):
-		teacher_query_results.add(correct_result)
-	num_teacher_results = len(teacher_query_results)
+	teacher_query_results = teacher_agent.get_class_instances(URIRef(teacher_property))
 
 	teacher_translated_answer_URIs = teacher_agent.translate_URIs_for_other_agent(teacher_query_results)
 
 	common_results = teacher_translated_answer_URIs.intersection(gt_student_query_results)
-	num_joint_results = len(common_results)
 
-	# init teacher and student
-	successful_setup = teacher_agent.reset_as_teacher(query_property=teacher_property,
-													  teacher_policy=teacher_policy)
+	query_ground_truth = dict()
+	query_ground_truth["gt_student_query_results"] = gt_student_query_results
+	# the GT results as a bitmask over the student's object IDs (GT objects that the student does not share with the teacher, are never results)
+	query_ground_truth["gt_student_query_results_mask"] = IDs_to_bitmask(student_agent.object_vocabulary.get_ID(URI)
+																		 for URI in gt_student_query_results if URI in student_agent.object_vocabulary)
+	query_ground_truth["num_gt_results"] = len(gt_student_query_results)
+	query_ground_truth["num_teacher_results"] = len(teacher_query_results)
+	query_ground_truth["num_joint_results"] = len(common_results)
+	return query_ground_truth
+
 
-	if successful_setup and num_gt_results == 0:
+def get_failed_query_experiment_outcome(successful_setup, query_ground_truth):
+	'''
+	:param successful_setup: whether the teacher found relevant examples for the query
+	:return: the outcome dictionary of a query experiment that cannot be executed, or None if it can be executed
+	'''
+	if successful_setup and query_ground_truth["num_gt_results"] == 0:
 		# print("Query:", teacher_property, "was captured by teacher's concepts, but student has not results!", student_property)
 		outcome_dict = {"completed": False, "fail_reason": "Student has no GT query results."}
-		outcome_dict["num_gt_results"] = num_gt_results
-		outcome_dict["num_teacher_results"] = num_teacher_results
-		outcome_dict["num_joint_results"] = num_joint_results
-		return outcome_dict, output_dict_step_wise
 	elif not successful_setup:
 		outcome_dict = {"completed": False, "fail_reason": "Teacher failed to find relevant examples."}
-		outcome_dict["num_gt_results"] = num_gt_results
-		outcome_dict["num_teacher_results"] = num_teacher_results
-		outcome_dict["num_joint_results"] = num_joint_results
-		return outcome_dict, output_dict_step_wise
+	else:
+		return None
+	outcome_dict["num_gt_results"] = query_ground_truth["num_gt_results"]
+	outcome_dict["num_teacher_results"] = query_ground_truth["num_teacher_results"]
+	outcome_dict["num_joint_results"] = query_ground_truth["num_joint_results"]
+	return outcome_dict
+
+
+def teacher_student_one_query_experiment(teacher_agent, student_agent, teacher_policy, student_policy,
+										 teacher_property, student_property, max_steps, eval_every, query_ground_truth=None):
+	'''
+	Here, one selected agent is trying to query something specific (one query) from another agent.
+	The evaluation should take place on the query results in traditional IR terms.
+	query_ground_truth can be provided (as returned by get_query_ground_truth), to avoid recomputing it for every repetition of the experiment.
+	:return: the outcome dictionary, and the step-wise metrics of the game (array of shape (number of recording steps, number of step-wise metrics)),
+	or None if the game could not be executed
+	'''
+	if query_ground_truth is None:
+		query_ground_truth = get_query_ground_truth(teacher_agent, student_agent, teacher_property, student_property)
+
+	num_gt_results = query_ground_truth["num_gt_results"]
+	num_teacher_results = query_ground_truth["num_teacher_results"]
+	num_joint_results = query_ground_truth["num_joint_results"]
+
+	# init teacher and student
+	successful_setup = teacher_agent.reset_as_teacher(query_property=teacher_property,
+													  teacher_policy=teacher_policy)
+
+	failed_outcome_dict = get_failed_query_experiment_outcome(successful_setup, query_ground_truth)
+	if failed_outcome_dict is not None:
+		return failed_outcome_dict, None
 
 	student_agent.reset_as_student(student_policy=student_policy)
 
@@ -82,6 +199,8 @@ def teacher_student_one_query_experiment(teacher_agent, student_agent, teacher_p
 	total_steps = 0
 	precision = 0
 	recall = 0
+	average_precision = 0
+	r_precision = 0
 	tensorboard_recording_step = 0
 	episode_generation_deadend = False
 
@@ -91,38 +210,41 @@ def teacher_student_one_query_experiment(teacher_agent, student_agent, teacher_p
 	teachers_sem_mem_size = 0
 	students_sem_mem_size = 0
 
+	step_wise_values = np.zeros((len(get_recording_steps(max_steps, eval_every)), len(step_wise_metrics)))
+	recording_step_index = 0
+	# the student is only evaluated again after it has learned something
+	evaluation_cache = {}
+
 	while(tensorboard_recording_step < max_steps):
+		# if the experiment is over, its last values are recorded for all remaining steps, at once (in the order of step_wise_metrics)
+		if (precision == 1 and recall == 1) or episode_generation_deadend:
+			step_wise_values[recording_step_index:] = (False, precision, recall, query_result_size, teachers_ep_mem_size, students_ep_mem_size,
+													   teachers_sem_mem_size, students_sem_mem_size, average_precision, r_precision)
+			break
+
 		tensorboard_recording_step += eval_every
 
-		# if the experiment still goes on, we continue to execute it normally
-		if not((precision == 1 and recall == 1) or episode_generation_deadend):
-			step, precision, recall, query_result_size, episode_generation_deadend = \
-				teacher_student_one_query_one_interaction_cycle(teacher_agent, student_agent,
-																gt_student_query_results, steps=eval_every)
-			teachers_ep_mem_size = teacher_agent.get_episodic_memory_size()
-			students_ep_mem_size = student_agent.get_episodic_memory_size()
-			teachers_sem_mem_size = teacher_agent.get_semantic_memory_size()
-			students_sem_mem_size = student_agent.get_semantic_memory_size()
-			output_dict_step_wise["0.running"][tensorboard_recording_step].append(True)
-			total_steps += step
-		else:
-			output_dict_step_wise["0.running"][tensorboard_recording_step].append(False)
-
-
-		# either if the experiment still goes on, or simply if we have the last recorded values, we still record them for tensorboard.
-		output_dict_step_wise["1.precision"][tensorboard_recording_step].append(precision)
-		output_dict_step_wise["2.recall"][tensorboard_recording_step].append(recall)
-		output_dict_step_wise["3.query_result_size"][tensorboard_recording_step].append(query_result_size)
-		output_dict_step_wise["4.teachers_ep_mem_size"][tensorboard_recording_step].append(teachers_ep_mem_size)
-		output_dict_step_wise["5.students_ep_mem_size"][tensorboard_recording_step].append(students_ep_mem_size)
-		output_dict_step_wise["6.teachers_sem_mem_size"][tensorboard_recording_step].append(teachers_sem_mem_size)
-		output_dict_step_wise["7.students_sem_mem_size"][tensorboard_recording_step].append(students_sem_mem_size)
+		# otherwise, we continue to execute it normally
+		step, precision, recall, query_result_size, average_precision, r_precision, episode_generation_deadend = \
+			teacher_student_one_query_one_interaction_cycle(teacher_agent, student_agent,
+															query_ground_truth, steps=eval_every, evaluation_cache=evaluation_cache)
+		teachers_ep_mem_size = teacher_agent.get_episodic_memory_size()
+		students_ep_mem_size = student_agent.get_episodic_memory_size()
+		teachers_sem_mem_size = teacher_agent.get_semantic_memory_size()
+		students_sem_mem_size = student_agent.get_semantic_memory_size()
+		total_steps += step
+
+		step_wise_values[recording_step_index] = (True, precision, recall, query_result_size, teachers_ep_mem_size, students_ep_mem_size,
+												  teachers_sem_mem_size, students_sem_mem_size, average_precision, r_precision)
+		recording_step_index += 1
 
 
 	outcome_dict={}
 	outcome_dict["completed"] = True
 	outcome_dict["precision"] = precision
 	outcome_dict["recall"] = recall
+	outcome_dict["average_precision"] = average_precision
+	outcome_dict["r_precision"] = r_precision
 	outcome_dict["total_steps"] = total_steps
 	outcome_dict["episode_generation_deadend"] = int(episode_generation_deadend)
 	outcome_dict["query_result_size"] = query_result_size
@@ -134,23 +256,207 @@ def teacher_student_one_query_experiment(teacher_agent, student_agent, teacher_p
 	outcome_dict["teachers_sem_mem_size"] = teacher_agent.get_semantic_memory_size()
 	outcome_dict["students_sem_mem_size"] = student_agent.get_semantic_memory_size()
 
-	return outcome_dict, output_dict_step_wise
+	return outcome_dict, step_wise_values
 
 
 
 
-def try_many_queries_separately_among_two_agents(args, ont_prefixes, query_mappings, teacher_policy, student_policy, exp_dir, complete_experiment_output_dict_step_wise):
-	statistics = defaultdict(dict)
-	agent_1_prefix = ont_prefixes[0]
-	agent_2_prefix = ont_prefixes[1]
-	agent_1_teacher_key = "teacher_" + agent_1_prefix
-	agent_2_teacher_key = "teacher_" + agent_2_prefix
+def teacher_student_one_query_batch_experiment(teacher_agent, student_agent, teacher_policy, student_policy,
+											   teacher_property, student_property, max_steps, eval_every, repetition_seeds,
+											   query_ground_truth=None):
+	'''
+	Simulates many repetitions of one query experiment in lockstep, one game per repetition seed, using the batched (vectorised)
+	functions of the agents. Only the frequency-based student can be simulated this way.
+	Every game results to exactly the same outputs as teacher_student_one_query_experiment, with the teacher seeded with the game's seed.
+	:return: list with the outcome dictionary and the step-wise metrics (or None) of every repetition
+	'''
+	if query_ground_truth is None:
+		query_ground_truth = get_query_ground_truth(teacher_agent, student_agent, teacher_property, student_property)
 
-	ontology_pair_start_t = datetime.datetime.now()
+	num_gt_results = query_ground_truth["num_gt_results"]
+	num_games = len(repetition_seeds)
 
-	# preprocess and initialize agents
-	agent_1 = Agent(agent_1_prefix, os.path.join(args.dataset_dir + "/" + args.data_directory, agent_1_prefix + ".owl"))
-	agent_2 = Agent(agent_2_prefix, os.path.join(args.dataset_dir + "/" + args.data_directory, agent_2_prefix + ".owl"))
+	# init teacher and student
+	successful_setup = teacher_agent.reset_as_batch_teacher(query_property=teacher_property, teacher_policy=teacher_policy,
+															random_seeds=repetition_seeds)
+
+	failed_outcome_dict = get_failed_query_experiment_outcome(successful_setup, query_ground_truth)
+	if failed_outcome_dict is not None:
+		return [(dict(failed_outcome_dict), None) for _ in range(num_games)]
+
+	student_agent.reset_as_batch_student(student_policy=student_policy, num_games=num_games)
+
+	# the teacher's examples are translated to the student's object IDs, and the query results are evaluated per object group
+	teacher_to_student_object_IDs = np.array([student_agent.object_vocabulary.get_ID(teacher_agent.instance_mapping_dict[URI])
+											  for URI in teacher_agent.object_vocabulary.ID_to_URI], dtype=np.int64)
+	object_group_sizes = student_agent.count_objects_per_object_group()
+	object_group_gt_sizes = student_agent.count_objects_per_object_group(query_ground_truth["gt_student_query_results_mask"])
+
+	step_wise_values = np.zeros((num_games, len(get_recording_steps(max_steps, eval_every)), len(step_wise_metrics)))
+	recording_step_index = 0
+	total_steps = [0] * num_games
+	precision = [0] * num_games
+	recall = [0] * num_games
+	average_precision = [0] * num_games
+	r_precision = [0] * num_games
+	query_result_size = [0] * num_games
+	perfect_score = np.zeros(num_games, dtype=bool)
+	episode_generation_deadend = np.zeros(num_games, dtype=bool)
+	tensorboard_recording_step = 0
+
+	teachers_ep_mem_size = [0] * num_games
+	students_ep_mem_size = [0] * num_games
+	teachers_sem_mem_size = [0] * num_games
+	students_sem_mem_size = [0] * num_games
+
+	# the version of the student's state in every game when it was last evaluated, since the students are only evaluated again after they have learned something
+	evaluated_student_state_versions = np.full(num_games, -1, dtype=np.int64)
+
+	while(tensorboard_recording_step < max_steps):
+		running_games = np.flatnonzero(~(perfect_score | episode_generation_deadend))
+		# if all games are over, their last values are recorded for all remaining steps, at once
+		if len(running_games) == 0:
+			step_wise_values[:, recording_step_index:] = step_wise_values[:, recording_step_index - 1: recording_step_index]
+			step_wise_values[:, recording_step_index:, step_wise_metrics.index("0.running")] = False
+			break
+
+		tensorboard_recording_step += eval_every
+
+		# the games that still go on, execute one interaction cycle of eval_every steps
+		cycle_games = running_games
+		cycle_steps = np.full(num_games, eval_every, dtype=np.int64)
+		for step in range(eval_every):
+			# if there are no more examples the Teacher can give, the game reaches a deadend
+			games_with_examples = teacher_agent.batch_num_examples_in_pool[cycle_games] > 0
+			deadend_games = cycle_games[~games_with_examples]
+			episode_generation_deadend[deadend_games] = True
+			cycle_steps[deadend_games] = step + 1
+			cycle_games = cycle_games[games_with_examples]
+			if len(cycle_games) == 0:
+				break
+			relevant_objects, irrelevant_objects = teacher_agent.select_next_teaching_examples(cycle_games)
+			examples_were_clear = student_agent.learn_from_examples(cycle_games, teacher_to_student_object_IDs[relevant_objects],
+																	teacher_to_student_object_IDs[irrelevant_objects])
+			teacher_agent.comprehend_students_responses_on_examples(examples_were_clear)
+
+		# evaluate the query results of the running games with the GT results, if the student's state has changed
+		evaluated_games = running_games[student_agent.batch_student_state_versions[running_games] != evaluated_student_state_versions[running_games]]
+		evaluated_student_state_versions[evaluated_games] = student_agent.batch_student_state_versions[evaluated_games]
+		ranked_object_group_IDs, ranked_query_result_groups = student_agent.get_batch_query_result_groups(evaluated_games)
+		ranked_object_group_sizes = object_group_sizes[ranked_object_group_IDs] * ranked_query_result_groups
+		ranked_object_group_gt_sizes = object_group_gt_sizes[ranked_object_group_IDs] * ranked_query_result_groups
+		query_result_sizes = ranked_object_group_sizes.sum(axis=1)
+		query_result_gt_sizes = ranked_object_group_gt_sizes.sum(axis=1)
+		average_precisions, r_precisions = get_ranked_query_result_metrics(ranked_object_group_sizes, ranked_object_group_gt_sizes, num_gt_results)
+
+		for i, game in enumerate(evaluated_games.tolist()):
+			query_result_size[game] = int(query_result_sizes[i])
+			num_correct_results = int(query_result_gt_sizes[i])
+			if query_result_size[game] != 0:
+				precision[game] = num_correct_results / query_result_size[game]
+			else:
+				precision[game] = 0
+			recall[game] = num_correct_results / num_gt_results
+			average_precision[game] = float(average_precisions[i])
+			r_precision[game] = float(r_precisions[i])
+			perfect_score[game] = precision[game] == 1 and recall[game] == 1
+
+		running = np.zeros(num_games, dtype=bool)
+		running[running_games] = True
+		for game in running_games.tolist():
+			teachers_ep_mem_size[game] = int(teacher_agent.batch_episodic_memory_sizes[game])
+			students_ep_mem_size[game] = int(student_agent.batch_episodic_memory_sizes[game])
+			teachers_sem_mem_size[game] = int(teacher_agent.batch_semantic_memory_sizes[game])
+			students_sem_mem_size[game] = int(student_agent.batch_semantic_memory_sizes[game])
+			total_steps[game] += int(cycle_steps[game])
+
+		# (in the order of step_wise_metrics)
+		step_wise_values[:, recording_step_index] = np.stack([running, precision, recall, query_result_size, teachers_ep_mem_size, students_ep_mem_size,
+															  teachers_sem_mem_size, students_sem_mem_size, average_precision, r_precision], axis=1)
+		recording_step_index += 1
+
+	repetition_outputs = []
+	for game in range(num_games):
+		outcome_dict={}
+		outcome_dict["completed"] = True
+		outcome_dict["precision"] = precision[game]
+		outcome_dict["recall"] = recall[game]
+		outcome_dict["average_precision"] = average_precision[game]
+		outcome_dict["r_precision"] = r_precision[game]
+		outcome_dict["total_steps"] = total_steps[game]
+		outcome_dict["episode_generation_deadend"] = int(episode_generation_deadend[game])
+		outcome_dict["query_result_size"] = query_result_size[game]
+		outcome_dict["num_gt_results"] = num_gt_results
+		outcome_dict["num_teacher_results"] = query_ground_truth["num_teacher_results"]
+		outcome_dict["num_joint_results"] = query_ground_truth["num_joint_results"]
+		outcome_dict["teachers_ep_mem_size"] = int(teacher_agent.batch_episodic_memory_sizes[game])
+		outcome_dict["students_ep_mem_size"] = int(student_agent.batch_episodic_memory_sizes[game])
+		outcome_dict["teachers_sem_mem_size"] = int(teacher_agent.batch_semantic_memory_sizes[game])
+		outcome_dict["students_sem_mem_size"] = int(student_agent.batch_semantic_memory_sizes[game])
+		repetition_outputs.append((outcome_dict, step_wise_values[game]))
+
+	return repetition_outputs
+
+
+def run_query_repetitions(agents, args, repetitions_task):
+	'''
+	Runs some repetitions of a query experiment, with the teacher's random number generator seeded for each repetition.
+	Repetitions with a frequency-based student are simulated together (see teacher_student_one_query_batch_experiment).
+	:param agents: the two prepared agents of the ontology pair
+	:param repetitions_task: tuple (teacher index, teacher policy, student policy, query, query translation, query ground truth, repetition seeds)
+	:return: list with the outcome dictionary and the step-wise metrics (or None) of every repetition
+	'''
+	teacher_index, teacher_policy, student_policy, query, query_translation, query_ground_truth, repetition_seeds = repetitions_task
+	teacher_agent = agents[teacher_index]
+	student_agent = agents[(teacher_index + 1) % 2]
+
+	if student_policy.lower() == "frequency-based":
+		return teacher_student_one_query_batch_experiment(teacher_agent, student_agent, teacher_policy, student_policy, query,
+														  query_translation, args.max_steps, args.eval_every, repetition_seeds,
+														  query_ground_truth=query_ground_truth)
+
+	repetition_outputs = []
+	for repetition_seed in repetition_seeds:
+		teacher_agent.set_random_seed(repetition_seed)
+		repetition_outputs.append(teacher_student_one_query_experiment(teacher_agent, student_agent, teacher_policy, student_policy, query,
+																	   query_translation, args.max_steps, args.eval_every,
+																	   query_ground_truth=query_ground_truth))
+	return repetition_outputs
+
+# the agents (and arguments) of the ontology pair, in a repetition worker process
+repetition_worker_agents_and_args = None
+
+def initialise_repetition_worker(agents, args):
+	global repetition_worker_agents_and_args
+	repetition_worker_agents_and_args = (agents, args)
+
+def run_query_repetitions_in_worker(repetitions_task):
+	agents, args = repetition_worker_agents_and_args
+	return run_query_repetitions(agents, args, repetitions_task)
+
+def load_ontology_pair_agents(args, ont_prefixes):
+	'''
+	Loads the agents of an ontology pair, which can then be prepared for the games with any set of common instances
+	(see prepare_ontology_pair_agents), and can be shared among experiments with different policies.
+	:return: a dictionary with the two agents (and how they are prepared)
+	'''
+	agent_pair = dict()
+	agent_pair["agents"] = [Agent(agent_prefix, os.path.join(args.dataset_dir + "/" + args.data_directory, agent_prefix + ".owl"),
+								  ontology_cache_dir=args.ontology_cache_dir)
+							for agent_prefix in ont_prefixes]
+	agent_pair["common_instances"] = None
+	agent_pair["agents_are_prepared"] = False
+	return agent_pair
+
+def prepare_ontology_pair_agents(args, ont_prefixes, agent_pair):
+	'''
+	Reads the common instance alignments of the agents (according to args.common_instances). The agents themselves are prepared for
+	the games, i.e. their groups and positive property sets are computed, only once they are needed (see try_many_queries_separately_among_two_agents).
+	'''
+	agent_1, agent_2 = agent_pair["agents"]
+	agent_1_prefix, agent_2_prefix = ont_prefixes
+	if agent_pair["common_instances"] == args.common_instances:
+		return agent_pair
 
 	# read common instance alignments
 	if args.common_instances == "simple":
@@ -168,15 +474,46 @@ def try_many_queries_separately_among_two_agents(args, ont_prefixes, query_mappi
 	else:
 		raise ValueError("argument --common_instances, got wrong value:" + args.common_instances)
 
-	# save instance mapping dictionary, initialize groups and concept vocabulary
-	agent_1.prepare_for_understanding_games(ontology_1_to_ontology_2_instance_mapping_dict)
-	agent_2.prepare_for_understanding_games(ontology_2_to_ontology_1_instance_mapping_dict)
+	agent_pair["common_instances"] = args.common_instances
+	agent_pair["instance_mapping_dicts"] = [ontology_1_to_ontology_2_instance_mapping_dict, ontology_2_to_ontology_1_instance_mapping_dict]
+	agent_pair["agents_are_prepared"] = False
+	return agent_pair
 
-	ontology_pair_output_dict_step_wise = defaultdict(lambda: defaultdict(list))
+def try_many_queries_separately_among_two_agents(args, ont_prefixes, query_mappings, teacher_policy, student_policy, exp_dir, agent_pair=None):
+	'''
+	Runs all query experiments of an ontology pair, and writes their report.
+	:param agent_pair: (optional) the agents of the ontology pair, as returned by load_ontology_pair_agents, to be shared among experiments
+	:return: the outcomes of all repetitions of the ontology pair (ColumnarResultStore of outcome_metrics),
+	the step-wise metrics of all its games (ColumnarResultStore of step_wise_metrics), and its summary for "0_Comparisons_Summary.txt"
+	'''
+	statistics = defaultdict(dict)
+	agent_1_prefix = ont_prefixes[0]
+	agent_2_prefix = ont_prefixes[1]
+	agent_1_teacher_key = "teacher_" + agent_1_prefix
+	agent_2_teacher_key = "teacher_" + agent_2_prefix
+
+	ontology_pair_start_t = datetime.datetime.now()
+
+	# preprocess and initialize agents
+	if agent_pair is None:
+		agent_pair = load_ontology_pair_agents(args, ont_prefixes)
+	prepare_ontology_pair_agents(args, ont_prefixes, agent_pair)
+	agent_1, agent_2 = agent_pair["agents"]
+	ontology_1_to_ontology_2_instance_mapping_dict, ontology_2_to_ontology_1_instance_mapping_dict = agent_pair["instance_mapping_dicts"]
+
+	# the step-wise metrics of every executed game, of every query experiment
+	recording_steps = get_recording_steps(args.max_steps, args.eval_every)
+	ontology_pair_step_wise_results = ColumnarResultStore(step_wise_metrics, row_shape=(len(recording_steps),),
+														  capacity=len(agent_pair["agents"]) * len(query_mappings) * args.repetitions)
+
+	agents = [agent_1, agent_2]
+	# the agents are only prepared for the games (and the repetition workers are only started) if there are repetitions to execute,
+	# since query experiments that were completed by a previous (interrupted) run of the same experiment, are read from its checkpoint store
+	repetition_executor = None
+	checkpoint_store = CheckpointStore(os.path.join(exp_dir, "checkpoints", "-".join(ont_prefixes) + ".pickle"), header=get_checkpoint_header(args))
 
 	# execute query experiments:
 	for q in range(len(query_mappings)):
-		agents = [agent_1, agent_2]
 		agent_teacher_keys = [agent_1_teacher_key, agent_2_teacher_key]
 		query_mapping = query_mappings[q]
 
@@ -190,31 +527,73 @@ def try_many_queries_separately_among_two_agents(args, ont_prefixes, query_mappi
 			query_pair = (query,query_translation)
 			agent_teacher_key = agent_teacher_keys[teacher_index]
 
-			statistics[agent_teacher_key][query_pair] = defaultdict(list)
-
-			for iteration in range(args.repetitions):
-				outcome_dict, ontology_pair_output_dict_step_wise = teacher_student_one_query_experiment(teacher_agent, student_agent,
-																										 teacher_policy, student_policy, URIRef(query),
-																										 URIRef(query_translation), args.max_steps,
-																										 args.eval_every, ontology_pair_output_dict_step_wise)
-
-				statistics[agent_teacher_key][query_pair]["completed"].append(outcome_dict["completed"])
-				statistics[agent_teacher_key][query_pair]["num_gt_results"] = outcome_dict["num_gt_results"]
-				statistics[agent_teacher_key][query_pair]["num_teacher_results"] = outcome_dict["num_teacher_results"]
-				statistics[agent_teacher_key][query_pair]["num_joint_results"] = outcome_dict["num_joint_results"]
+			query_statistics = {"outcomes": ColumnarResultStore(outcome_metrics, capacity=args.repetitions), "fail_reason": []}
+			statistics[agent_teacher_key][query_pair] = query_statistics
+
+			# the repetitions of every query experiment are checkpointed together, once they are all completed, with the key
+			# (direction, query, query translation): the outcome dictionaries of the repetitions, and the step-wise metrics of
+			# their executed games in one array (or None)
+			checkpoint_key = (teacher_index, query, query_translation)
+			query_checkpoint = checkpoint_store.get(checkpoint_key)
+
+			if query_checkpoint is None:
+				if not agent_pair["agents_are_prepared"]:
+					# save instance mapping dictionary, initialize groups and concept vocabulary
+					agent_1.prepare_for_understanding_games(ontology_1_to_ontology_2_instance_mapping_dict)
+					agent_2.prepare_for_understanding_games(ontology_2_to_ontology_1_instance_mapping_dict)
+					agent_pair["agents_are_prepared"] = True
+				# the repetition workers receive a copy of the prepared agents once, when they are started
+				if repetition_executor is None and args.repetition_workers > 1:
+					repetition_executor = ProcessPoolExecutor(max_workers=args.repetition_workers, initializer=initialise_repetition_worker,
+															  initargs=(agents, args))
+
+				# query results do not change across repetitions, so they are computed once
+				query_ground_truth = get_query_ground_truth(teacher_agent, student_agent, URIRef(query), URIRef(query_translation))
+
+				# every repetition is seeded independently, from the master seed and (pair, direction, query, repetition),
+				# so that the results do not depend on whether the repetitions are executed serially, in parallel, or after resuming
+				repetition_seeds = [derive_seed(args.seed, "-".join(ont_prefixes), teacher_index, query, iteration) for iteration in range(args.repetitions)]
+				if repetition_executor is not None:
+					# the workers execute consecutive chunks of repetitions
+					chunk_size = max(1, -(-len(repetition_seeds) // args.repetition_workers))
+					repetitions_tasks = [(teacher_index, teacher_policy, student_policy, URIRef(query), URIRef(query_translation), query_ground_truth,
+										  repetition_seeds[chunk_start:chunk_start + chunk_size])
+										 for chunk_start in range(0, len(repetition_seeds), chunk_size)]
+					repetition_outputs = itertools.chain.from_iterable(repetition_executor.map(run_query_repetitions_in_worker, repetitions_tasks))
+				else:
+					repetition_outputs = run_query_repetitions(agents, args, (teacher_index, teacher_policy, student_policy, URIRef(query),
+																			  URIRef(query_translation), query_ground_truth, repetition_seeds))
+
+				repetition_outputs = list(repetition_outputs)
+				step_wise_values = [repetition_step_wise_values for _, repetition_step_wise_values in repetition_outputs
+									if repetition_step_wise_values is not None]
+				query_checkpoint = {"outcomes": [outcome_dict for outcome_dict, _ in repetition_outputs],
+									"step_wise_values": np.stack(step_wise_values) if len(step_wise_values) != 0 else None}
+				checkpoint_store.add(checkpoint_key, query_checkpoint)
+
+			# repetition outputs are merged in the order of the repetitions
+			if query_checkpoint["step_wise_values"] is not None:
+				for repetition_step_wise_values in query_checkpoint["step_wise_values"]:
+					ontology_pair_step_wise_results.add_row(repetition_step_wise_values)
+			for outcome_dict in query_checkpoint["outcomes"]:
+				query_statistics["num_gt_results"] = outcome_dict["num_gt_results"]
+				query_statistics["num_teacher_results"] = outcome_dict["num_teacher_results"]
+				query_statistics["num_joint_results"] = outcome_dict["num_joint_results"]
 
 				if outcome_dict["completed"]:
-					keys_to_append_list = ["precision", "recall", "total_steps", "episode_generation_deadend", "query_result_size",
-										   "teachers_ep_mem_size", "students_ep_mem_size", "teachers_sem_mem_size", "students_sem_mem_size"]
-					append_to_list_from_one_dictionary_to_other(source_dict=outcome_dict, target_dict=statistics[agent_teacher_key][query_pair],
-														keys_to_append_list=keys_to_append_list)
-					prefect_score = int((outcome_dict["precision"] == 1) and (outcome_dict["recall"] == 1))
-					statistics[agent_teacher_key][query_pair]["perfect_score"].append(prefect_score)
+					outcome = {metric: outcome_dict[metric] for metric in outcome_metrics if metric != "perfect_score"}
+					outcome["perfect_score"] = int((outcome_dict["precision"] == 1) and (outcome_dict["recall"] == 1))
+					query_statistics["outcomes"].add_row(outcome)
 				else:
-					statistics[agent_teacher_key][query_pair]["fail_reason"].append(outcome_dict["fail_reason"])
+					query_statistics["outcomes"].add_row({"completed": False})
+					query_statistics["fail_reason"].append(outcome_dict["fail_reason"])
+
+	if repetition_executor is not None:
+		repetition_executor.shutdown()
+	checkpoint_store.close()
 
 	# aggregate and structure query results
-	ont_pair_statistics = defaultdict(list)
+	ont_pair_statistics = ColumnarResultStore(outcome_metrics, capacity=len(agents) * len(query_mappings) * args.repetitions)
 	detailed_statistics_str_descriptions = []
 	# we save all unsuccessful queries (where the teacher couldn't come up with not even one example) in a list to print them all together at the end
 	unsuccessful_queries = []
@@ -230,22 +609,20 @@ def try_many_queries_separately_among_two_agents(args, ont_prefixes, query_mappi
 			query_translation = queries[student_index]
 			query_pair = (query, query_translation)
 
-			av_stats_dict, std_stats_dict = aggregate_statistics_of_dictionary_of_list_of_values(statistics[agent_teacher_key][query_pair])
+			query_statistics = statistics[agent_teacher_key][query_pair]
+
+			query_description_str = "Query: " + query + " (" + str(query_statistics["num_teacher_results"])\
+									+ "), -> " + query_translation +"(" + str(query_statistics["num_gt_results"]) \
+									+ "), Common Results: " + str(query_statistics["num_joint_results"])
 
-			query_description_str = "Query: " + query + " (" + str(av_stats_dict["num_teacher_results"])\
-									+ "), -> " + query_translation +"(" + str(av_stats_dict["num_gt_results"]) \
-									+ "), Common Results: " + str(av_stats_dict["num_joint_results"])
+			# the outcomes of the repetitions that could not be executed are only counted in "completed"
+			ont_pair_statistics.extend(query_statistics["outcomes"])
 
 			# in case for some reason, the game was not successfully initiated for any of the iterations:
-			# (if no experiment was executed successfully, then no statistics were appended for this teacher-query combination)
-			if sum(statistics[agent_teacher_key][query_pair]["completed"]) == 0:
-				unsuccessful_queries.append((query_description_str, av_stats_dict["fail_reason"][0]))
-				ont_pair_statistics["completed"] += statistics[agent_teacher_key][query_pair]["completed"]
+			if query_statistics["outcomes"].get_values("completed").sum() == 0:
+				unsuccessful_queries.append((query_description_str, query_statistics["fail_reason"][0]))
 			else:
-				keys_to_append_list = ["completed", "precision", "recall", "total_steps", "query_result_size", "episode_generation_deadend",
-									   "perfect_score", "teachers_ep_mem_size", "students_ep_mem_size", "teachers_sem_mem_size", "students_sem_mem_size"]
-				append_to_list_from_one_dictionary_to_other(source_dict=statistics[agent_teacher_key][query_pair], target_dict=ont_pair_statistics,
-															keys_to_append_list=keys_to_append_list)
+				av_stats_dict, std_stats_dict = query_statistics["outcomes"].get_mean_and_std_dicts()
 				detailed_statistics_str_descriptions.append(query_description_str)
 				detailed_statistics_str_descriptions.append(format_average_query_performance_in_str(av_stats_dict, std_stats_dict, is_single_query=True))
 
@@ -253,10 +630,8 @@ def try_many_queries_separately_among_two_agents(args, ont_prefixes, query_mappi
 	os.mkdir(tensorboard_writer_ontology_pair_experiment_dir)
 	ontology_pair_tensorboard_writer = SummaryWriter(log_dir=tensorboard_writer_ontology_pair_experiment_dir)
 
-	# write to tensorboard while also update  complete_experiment_output_dict_step_wise  according to ontology_pair_output_dict_step_wise 9append values per key and per step.
-	_, complete_experiment_output_dict_step_wise = write_average_query_performance_to_tensorboard(
-		ontology_pair_tensorboard_writer, ontology_pair_output_dict_step_wise, args.max_steps, args.eval_every,
-	other_dictionary_to_append=complete_experiment_output_dict_step_wise)
+	write_average_query_performance_to_tensorboard(ontology_pair_tensorboard_writer, ontology_pair_step_wise_results, recording_steps, args.max_steps)
+	ontology_pair_tensorboard_writer.close()
 
 	# write results to file
 	# aggregate and report results per agent-teacher_role and per query
@@ -271,14 +646,14 @@ def try_many_queries_separately_among_two_agents(args, ont_prefixes, query_mappi
 
 		ontology_pair_file.write(text_for_ontology_pair_file + "\n")
 
-		av_ont_pair_stats_dict, std_ont_pair_stats_dict = aggregate_statistics_of_dictionary_of_list_of_values(ont_pair_statistics)
+		av_ont_pair_stats_dict, std_ont_pair_stats_dict = ont_pair_statistics.get_mean_and_std_dicts()
 
 		ontology_pair_file.write("Overall ontology pair performance over the completed query experiments:\n")
 		ontology_pair_overall_performance_str = format_average_query_performance_in_str(av_ont_pair_stats_dict, std_ont_pair_stats_dict, is_single_query=False)
 		ontology_pair_file.write(ontology_pair_overall_performance_str + "\n")
 
-		with open(os.path.join(exp_dir, "0_Comparisons_Summary.txt"), "a") as complete_experiments_comparisons_file:
-			complete_experiments_comparisons_file.write(text_for_ontology_pair_file + "\n" + ontology_pair_overall_performance_str + "\n\n")
+		# the summary of the ontology pair is returned, and it is written to "0_Comparisons_Summary.txt" by the caller, in the order of the pairs
+		ontology_pair_comparison_summary_str = text_for_ontology_pair_file + "\n" + ontology_pair_overall_performance_str + "\n\n"
 
 		ontology_pair_end_t = datetime.datetime.now()
 		ontology_pair_time_delta = ontology_pair_end_t - ontology_pair_start_t
@@ -298,11 +673,48 @@ def try_many_queries_separately_among_two_agents(args, ont_prefixes, query_mappi
 			ontology_pair_file.write(query_description_str + "| Reason:" + fail_reason + "\n\n")
 			# print(query_description_str + "| Reason:" + fail_reason + "\n")
 
-	return ont_pair_statistics, complete_experiment_output_dict_step_wise
+	return ont_pair_statistics, ontology_pair_step_wise_results, ontology_pair_comparison_summary_str
 
-def run_all_teacher_student_combinations_using_gold_alignments(args):
-	all_prefix_pairs = get_all_prefix_pairs()
+def get_checkpoint_header(args):
+	'''
+	:return: the configuration that the checkpointed repetitions of an experiment depend on, and which is not part of the name of its directory
+	'''
+	checkpoint_header = dict()
+	for argument in ["dataset_dir", "data_directory", "reference_alignments_dir", "instance_alignments_dir", "eval_every", "seed"]:
+		checkpoint_header[argument] = getattr(args, argument)
+	# the repetitions are checkpointed per query experiment, and their step-wise metrics as arrays, in the order of step_wise_metrics
+	checkpoint_header["checkpoint_unit"] = "query_experiment"
+	checkpoint_header["step_wise_metrics"] = step_wise_metrics
+	return checkpoint_header
+
+def run_ontology_pair_experiment(args, prefix_pair, experiment_configurations):
+	'''
+	Runs all query experiments of one ontology pair, for every experiment configuration. Ontology pairs are independent of each other,
+	so this function can be executed in a separate process: every repetition is seeded on its own (from args.seed),
+	and the outcomes and step-wise metrics of the pair are returned (as columnar result stores), to be merged by the caller.
+	The agents are loaded once, and they are prepared once per set of common instances, for all configurations that use it.
+	:param experiment_configurations: list of (configuration arguments, experiment directory) pairs, as returned by get_experiment_configurations
+	:return: list with the outcomes of the ontology pair, its step-wise metrics, and its summary for "0_Comparisons_Summary.txt", per configuration
+	'''
+	prefix_pair_tuple = prefix_pair.split("-")
+	equivalent_classes, equivalent_properties = load_ontology_alignments(ont_1_prefix=prefix_pair_tuple[0],
+					 ont_2_prefix=prefix_pair_tuple[1], dir_path=args.dataset_dir + "/" + args.reference_alignments_dir)
+
+	agent_pair = load_ontology_pair_agents(args, prefix_pair_tuple)
+
+	configuration_outputs = []
+	for configuration_args, exp_dir in experiment_configurations:
+		configuration_outputs.append(try_many_queries_separately_among_two_agents(
+			configuration_args, ont_prefixes=prefix_pair_tuple, query_mappings=equivalent_classes, teacher_policy=configuration_args.teacher_policy,
+			student_policy=configuration_args.student_policy, exp_dir=exp_dir, agent_pair=agent_pair))
+
+	return configuration_outputs
 
+def prepare_experiment_directory(args, all_prefix_pairs):
+	'''
+	:param args: the arguments of one experiment configuration
+	:return: the (emptied) directory of the experiment
+	'''
 	# prepare experiment directories and filenames
 	if not os.path.isdir(args.exp_dir):
 		os.mkdir(args.exp_dir)
@@ -320,9 +732,12 @@ def run_all_teacher_student_combinations_using_gold_alignments(args):
 	experiment_name += "max_steps=" + str(args.max_steps)
 
 	exp_dir = os.path.join(args.exp_dir, experiment_name)
-	# 	if the directory exists already then we empty it
+	# 	if the directory exists already then we empty it (except for the checkpoints of the completed repetitions, if we resume it)
 	if os.path.isdir(exp_dir):
 		for file in os.listdir(exp_dir):
+			if args.resume and file == "checkpoints":
+				print("Resuming experiment from its checkpoints.")
+				continue
 			path = os.path.join(exp_dir, file)
 			if os.path.isfile(path):
 				os.remove(path)
@@ -332,60 +747,117 @@ def run_all_teacher_student_combinations_using_gold_alignments(args):
 	else:
 		os.mkdir(exp_dir)
 
-
 	print("Running experiment. Output will be saved in directory:", exp_dir)
+	return exp_dir
 
-	tensorboard_writer_average_experiment_dir = os.path.join(exp_dir, "average")
-	os.mkdir(tensorboard_writer_average_experiment_dir)
-	experiment_average_tensorboard_writer = SummaryWriter(log_dir=tensorboard_writer_average_experiment_dir)
+def get_experiment_configurations(args):
+	'''
+	The common instances and the policies can be given as lists (a sweep), in which case every combination is a separate experiment,
+	with its own directory. Configurations are ordered by their common instances, so that the agents are prepared once per set of common instances.
+	:return: list of (configuration arguments, experiment directory) pairs
+	'''
+	all_prefix_pairs = get_all_prefix_pairs()
+	experiment_configurations = []
+	for common_instances in get_argument_values(args.common_instances):
+		for teacher_policy in get_argument_values(args.teacher_policy):
+			for student_policy in get_argument_values(args.student_policy):
+				configuration_args = copy.copy(args)
+				configuration_args.common_instances = common_instances
+				configuration_args.teacher_policy = teacher_policy
+				configuration_args.student_policy = student_policy
+				experiment_configurations.append((configuration_args, prepare_experiment_directory(configuration_args, all_prefix_pairs)))
+	return experiment_configurations
+
+def get_argument_values(argument):
+	'''
+	:return: the values of an argument that accepts one or more values, as a list
+	'''
+	if isinstance(argument, (list, tuple)):
+		return list(argument)
+	return [argument]
+
+def run_all_teacher_student_combinations_using_gold_alignments(args):
+	all_prefix_pairs = get_all_prefix_pairs()
 
-	ontology_pair_performances_dict = defaultdict(list)
+	experiment_configurations = get_experiment_configurations(args)
+
+	experiment_outcomes = [ColumnarResultStore(outcome_metrics) for _ in experiment_configurations]
 	# monitor experiment execution time per ontology pair.
 	start_t = datetime.datetime.now()
 
-	complete_experiment_output_dict_step_wise = defaultdict(lambda: defaultdict(list))
+	recording_steps = get_recording_steps(args.max_steps, args.eval_every)
+	experiment_step_wise_results = [ColumnarResultStore(step_wise_metrics, row_shape=(len(recording_steps),)) for _ in experiment_configurations]
+
+	# ontology pairs are executed independently (in parallel, if more than one workers are requested),
+	# and their outputs are merged here, always in the order of the pairs, so that the results do not depend on the scheduling
+	if args.workers > 1:
+		# the ontologies are parsed before starting the workers, so that (forked) workers inherit them instead of parsing them again
+		for ontology_prefix in sorted({prefix for prefix_pair in all_prefix_pairs for prefix in prefix_pair.split("-")}):
+			load_ontology_graph(os.path.join(args.dataset_dir + "/" + args.data_directory, ontology_prefix + ".owl"), cache_dir=args.ontology_cache_dir)
+		executor = ProcessPoolExecutor(max_workers=args.workers)
+		pair_outputs = executor.map(run_ontology_pair_experiment, itertools.repeat(args), all_prefix_pairs, itertools.repeat(experiment_configurations))
+	else:
+		executor = None
+		pair_outputs = map(run_ontology_pair_experiment, itertools.repeat(args), all_prefix_pairs, itertools.repeat(experiment_configurations))
 
-	for prefix_pair in all_prefix_pairs:
-		prefix_pair_tuple = prefix_pair.split("-")
-		equivalent_classes, equivalent_properties = load_ontology_alignments(ont_1_prefix=prefix_pair_tuple[0],
-						 ont_2_prefix=prefix_pair_tuple[1], dir_path=args.dataset_dir + "/" + args.reference_alignments_dir)
+	for configuration_outputs in pair_outputs:
+		for c, (_, exp_dir) in enumerate(experiment_configurations):
+			pair_outcomes, pair_step_wise_results, ontology_pair_comparison_summary_str = configuration_outputs[c]
 
-		pair_ontology_performance, complete_experiment_output_dict_step_wise = try_many_queries_separately_among_two_agents(args, ont_prefixes=prefix_pair_tuple,
-					query_mappings=equivalent_classes, teacher_policy=teacher_policy,	student_policy=student_policy,
-										exp_dir=exp_dir, complete_experiment_output_dict_step_wise=complete_experiment_output_dict_step_wise)
+			experiment_outcomes[c].extend(pair_outcomes)
+			experiment_step_wise_results[c].extend(pair_step_wise_results)
 
-		keys_to_append_list = ["completed", "precision", "recall", "total_steps", "query_result_size", "episode_generation_deadend",
-							   "perfect_score", "teachers_ep_mem_size", "students_ep_mem_size", "teachers_sem_mem_size", "students_sem_mem_size"]
-		append_to_list_from_one_dictionary_to_other(source_dict=pair_ontology_performance, target_dict=ontology_pair_performances_dict,
-													keys_to_append_list=keys_to_append_list)
+			with open(os.path.join(exp_dir, "0_Comparisons_Summary.txt"), "a") as complete_experiments_comparisons_file:
+				complete_experiments_comparisons_file.write(ontology_pair_comparison_summary_str)
 
+	if executor is not None:
+		executor.shutdown()
 
+	# (the configurations of a sweep are executed together, so the duration of the whole sweep is reported for each one of them)
 	end_t = datetime.datetime.now()
 	time_delta = end_t - start_t
 	minutes = time_delta.total_seconds() / 60
 
-	av_performance_stats_dict, std_performance_stats_dict = aggregate_statistics_of_dictionary_of_list_of_values(ontology_pair_performances_dict)
+	for c, (configuration_args, exp_dir) in enumerate(experiment_configurations):
+		if len(experiment_configurations) > 1:
+			print("Experiment:", exp_dir)
+		write_experiment_summary(configuration_args, exp_dir, experiment_outcomes[c], experiment_step_wise_results[c], minutes)
+
+def write_experiment_summary(args, exp_dir, experiment_outcomes, experiment_step_wise_results, minutes):
+	'''
+	Writes the summary of all ontology pairs of an experiment, its average step-wise performance (to tensorboard),
+	and the step-wise metrics of all its games (to "step_wise_results.npz", see ColumnarResultStore), and prints its average performance
+	'''
+	av_performance_stats_dict, std_performance_stats_dict = experiment_outcomes.get_mean_and_std_dicts()
 
 	performance_summary_str = format_average_query_performance_in_str(av_performance_stats_dict, std_performance_stats_dict, is_single_query=False)
 
-	average_values_per_step, _ = write_average_query_performance_to_tensorboard(experiment_average_tensorboard_writer, complete_experiment_output_dict_step_wise, args.max_steps, args.eval_every)
+	# the tensorboard writer (and its background thread) is only created after all workers have finished
+	tensorboard_writer_average_experiment_dir = os.path.join(exp_dir, "average")
+	os.mkdir(tensorboard_writer_average_experiment_dir)
+	experiment_average_tensorboard_writer = SummaryWriter(log_dir=tensorboard_writer_average_experiment_dir)
+
+	recording_steps = get_recording_steps(args.max_steps, args.eval_every)
+	write_average_query_performance_to_tensorboard(experiment_average_tensorboard_writer, experiment_step_wise_results, recording_steps, args.max_steps)
+	experiment_average_tensorboard_writer.close()
 
 	with open(os.path.join(exp_dir, "0_Summary.txt"), "w") as complete_experiments_file:
 		complete_experiments_file.write(performance_summary_str)
 		complete_experiments_file.write(f"Experiment duration: {minutes:06.2} minutes.\n\n\n")
 
-	with open(os.path.join(exp_dir,'av_stats_per_step_dict.pickle'), 'wb') as handle:
-		pickle.dump(average_values_per_step, handle, protocol=pickle.HIGHEST_PROTOCOL)
+	experiment_step_wise_results.save(os.path.join(exp_dir, "step_wise_results.npz"), steps=recording_steps)
 
 	av_precision = av_performance_stats_dict["precision"]
 	av_recall = av_performance_stats_dict["recall"]
+	av_average_precision = av_performance_stats_dict["average_precision"]
+	av_r_precision = av_performance_stats_dict["r_precision"]
 	av_total_steps = av_performance_stats_dict["total_steps"]
 	av_teacher_ep_mem = av_performance_stats_dict["teachers_ep_mem_size"]
 	av_student_ep_mem = av_performance_stats_dict["students_ep_mem_size"]
 	av_student_sem_mem = av_performance_stats_dict["students_sem_mem_size"]
 
 
-	print(f"Task (Query) Performance Metrics:\nPrecision: {av_precision:04.2}, Recall: {av_recall:04.2}")
+	print(f"Task (Query) Performance Metrics:\nPrecision: {av_precision:04.2}, Recall: {av_recall:04.2}, Average Precision: {av_average_precision:04.2}, R-Precision: {av_r_precision:04.2}")
 	print(f"Efficiency Metrics:\nInteraction time (#Examples): {av_total_steps:04.2}, Teacher Episodic Memory: {av_teacher_ep_mem:04.2}, Student Episodic Memory: {av_student_ep_mem:04.2}, Student Working Memory: {av_student_sem_mem:04.2}")
 
 
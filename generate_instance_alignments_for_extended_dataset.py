@@ -1,37 +1,202 @@
 # This script identifies more instance alignments across pairs of ontologies, that allow us to
 from data_utils import *
 
-from rdflib import URIRef, Graph
+from rdflib import URIRef, Variable
+from rdflib.plugins.sparql import prepareQuery
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 
 
-def clean_instance_alignments(updated_alignments_dict_format, new_alignments, alignment_conflicts):
-    clean_new_alignments = set()
-    # checking for alignment conflicts: if we suggest a new alignment for a URI that is already aligned
-    for ontology_1_entity_URI, ontology_2_entity_URI in new_alignments:
-        # in case of conflict:
-        if ontology_1_entity_URI in updated_alignments_dict_format:
-            old_alignment = updated_alignments_dict_format[ontology_1_entity_URI]
-            # update conflict alignment dictionary
-            alignment_conflicts[ontology_1_entity_URI] = alignment_conflicts[ontology_1_entity_URI].union(
-                {old_alignment, ontology_2_entity_URI})
-        elif ontology_2_entity_URI in updated_alignments_dict_format:
-            old_alignment = updated_alignments_dict_format[ontology_2_entity_URI]
-            # update conflict alignment dictionary
-            alignment_conflicts[ontology_2_entity_URI] = alignment_conflicts[ontology_2_entity_URI].union(
-                {old_alignment, ontology_1_entity_URI})
-        else:
-            # if there are no conflicts regarding this alignment, we can just add it and move one.
-            clean_new_alignments.add((ontology_1_entity_URI, ontology_2_entity_URI))
-            updated_alignments_dict_format[ontology_1_entity_URI] = ontology_2_entity_URI
-            updated_alignments_dict_format[ontology_2_entity_URI] = ontology_1_entity_URI
-
-    return clean_new_alignments, alignment_conflicts, updated_alignments_dict_format
+class InstanceAlignmentResolver:
+    '''
+    Resolves the conflicts among instance alignments incrementally. Candidate alignments are checked in the order they are proposed,
+    and the first one wins: a candidate is accepted only if none of its two entities is aligned already, and accepted alignments are
+    never withdrawn. Every candidate (accepted or not) also unites its two entities in a union-find structure over the entities of the
+    two ontologies, where every component counts its entities from each ontology, so that the conflicts (the components that are
+    not 1:1) can be reported in amortised O(α(n)) time per candidate.
+    Candidates are added in rounds, and resolve_round returns the alignments that were accepted in the current round.
+    '''
+    def __init__(self):
+        # the nodes of the union-find structure are (ontology index, entity) pairs
+        self.parent = {}
+        # number of the entities of ontology 1 and of ontology 2 of every component (root)
+        self.component_entity_counts = {}
+        # the entity of the other ontology, that every aligned node is aligned with
+        self.aligned_nodes = {}
+        # the alignments that were accepted in the current round
+        self.round_accepted_alignments = set()
+
+    def find(self, node):
+        if node not in self.parent:
+            self.parent[node] = node
+            self.component_entity_counts[node] = [0, 0]
+            self.component_entity_counts[node][node[0]] = 1
+            return node
+        # path halving
+        while self.parent[node] != node:
+            self.parent[node] = self.parent[self.parent[node]]
+            node = self.parent[node]
+        return node
+
+    def union(self, node_1, node_2):
+        '''
+        :return: the root of the united component
+        '''
+        root_1, root_2 = self.find(node_1), self.find(node_2)
+        if root_1 == root_2:
+            return root_1
+        counts_1, counts_2 = self.component_entity_counts[root_1], self.component_entity_counts[root_2]
+        # union by size
+        if counts_1[0] + counts_1[1] < counts_2[0] + counts_2[1]:
+            root_1, root_2 = root_2, root_1
+            counts_1, counts_2 = counts_2, counts_1
+        self.parent[root_2] = root_1
+        counts_1[0] += counts_2[0]
+        counts_1[1] += counts_2[1]
+        del self.component_entity_counts[root_2]
+        return root_1
+
+    def add_accepted_alignments(self, alignments):
+        '''
+        Adds alignments that are known to be correct, which are accepted without being checked for conflicts
+        '''
+        for ontology_1_entity, ontology_2_entity in alignments:
+            self.union((0, ontology_1_entity), (1, ontology_2_entity))
+            self.aligned_nodes[(0, ontology_1_entity)] = ontology_2_entity
+            self.aligned_nodes[(1, ontology_2_entity)] = ontology_1_entity
+
+    def add_candidate_alignment(self, ontology_1_entity, ontology_2_entity):
+        '''
+        Adds a candidate alignment to the current round
+        :return: whether the candidate was accepted as a new alignment
+        '''
+        node_1, node_2 = (0, ontology_1_entity), (1, ontology_2_entity)
+        # alignments that are already known are not in conflict with themselves
+        if self.aligned_nodes.get(node_1) == ontology_2_entity:
+            return False
+        self.union(node_1, node_2)
+        if node_1 in self.aligned_nodes or node_2 in self.aligned_nodes:
+            return False
+        self.aligned_nodes[node_1] = ontology_2_entity
+        self.aligned_nodes[node_2] = ontology_1_entity
+        self.round_accepted_alignments.add((ontology_1_entity, ontology_2_entity))
+        return True
+
+    def resolve_round(self):
+        '''
+        Ends the current round of candidate alignments
+        :return: the set of the accepted alignments of the round
+        '''
+        accepted_alignments = self.round_accepted_alignments
+        self.round_accepted_alignments = set()
+        return accepted_alignments
+
+    def get_conflicts(self):
+        '''
+        :return: sorted list of the conflicts, as (entities of ontology 1, entities of ontology 2) of every component that is not 1:1,
+        where the entities are sorted tuples
+        '''
+        conflicting_components = defaultdict(lambda: ([], []))
+        for node in self.parent:
+            root = self.find(node)
+            if max(self.component_entity_counts[root]) > 1:
+                conflicting_components[root][node[0]].append(node[1])
+        conflicts = [tuple(tuple(sorted(entities, key=lambda entity: entity.n3())) for entities in component_entities)
+                     for component_entities in conflicting_components.values()]
+        return sorted(conflicts, key=lambda conflict: ([entity.n3() for entity in conflict[0]], [entity.n3() for entity in conflict[1]]))
+
+
+def get_relation_indexes(ontology, relation_URIs):
+    '''
+    Builds hash tables over the triples of some properties of an ontology, with one scan of the triples of every property
+    :param relation_URIs: iterable of property URIRefs
+    :return: dictionary from every property to a pair of dictionaries: from the subjects of its triples to their objects,
+    and from the objects of its triples to their subjects
+    '''
+    relation_indexes = {}
+    for relation_URI in relation_URIs:
+        subject_to_objects, object_to_subjects = defaultdict(list), defaultdict(list)
+        for subject, object in ontology.subject_objects(relation_URI):
+            subject_to_objects[subject].append(object)
+            object_to_subjects[object].append(subject)
+        relation_indexes[relation_URI] = (subject_to_objects, object_to_subjects)
+    return relation_indexes
+
+def iterate_relation_based_candidate_alignments(relation_indexes_1, relation_indexes_2, alignments, relation_alignments, excluded_entities,
+                                               max_block_size=None, propagation_statistics=None):
+    '''
+    Proposes candidate alignments through aligned properties, with a hash join of the triples of the two ontologies on
+    (property alignment, aligned entity) keys: (x1, x2) is proposed if (e1, r1, x1) and (e2, r2, x2) hold, or (x1, r1, e1) and (x2, r2, e2) hold,
+    for some alignment (e1, e2) and some property alignment (r1, r2).
+    Every alignment is probed against the hash tables of the aligned properties of both ontologies (see get_relation_indexes),
+    which are built once for all rounds of the propagation, so the work of a round is proportional to the alignments it expands.
+    The related entities of every key form a block, and entities are paired within every block.
+    :param relation_indexes_1: the hash tables of the aligned properties of ontology 1, as returned by get_relation_indexes
+    :param relation_indexes_2: the hash tables of the aligned properties of ontology 2, as returned by get_relation_indexes
+    :param alignments: the alignments (e1, e2) to propagate
+    :param relation_alignments: list of property alignments (r1, r2), as URIRefs
+    :param excluded_entities: entities that cannot be part of a candidate alignment
+    :param max_block_size: (optional) blocks with more candidate pairs than this are skipped. A block that relates many entities of both ontologies
+    (e.g. through an author of many papers) only proposes ambiguous candidates, and pairing them is quadratic.
+    :param propagation_statistics: (optional) dictionary, in which the number of blocks, of skipped blocks and of candidates are counted
+    :return: generator of candidate alignments, block by block and in a deterministic order (the same candidate may be proposed by more than one blocks)
+    '''
+    if propagation_statistics is None:
+        propagation_statistics = defaultdict(int)
+
+    # every block is keyed by (property alignment index, whether the entities are the objects or the subjects of the triples, alignment),
+    # and it keeps the related entities of both ontologies
+    blocks = {}
+    for relation_index, (relation_1_URI, relation_2_URI) in enumerate(relation_alignments):
+        relation_1_indexes, relation_2_indexes = relation_indexes_1[relation_1_URI], relation_indexes_2[relation_2_URI]
+        for related_entities, index_1, index_2 in (("objects", relation_1_indexes[0], relation_2_indexes[0]),
+                                                    ("subjects", relation_1_indexes[1], relation_2_indexes[1])):
+            for alignment in alignments:
+                ontology_1_entities = [entity for entity in index_1.get(alignment[0], ()) if entity not in excluded_entities]
+                if len(ontology_1_entities) == 0:
+                    continue
+                ontology_2_entities = [entity for entity in index_2.get(alignment[1], ()) if entity not in excluded_entities]
+                if len(ontology_2_entities) == 0:
+                    continue
+                blocks[(relation_index, related_entities, alignment)] = (ontology_1_entities, ontology_2_entities)
+
+    # blocks (and their entities) are paired in sorted order, so that candidates are always proposed in the same order
+    for block_key in sorted(blocks, key=lambda block_key: (block_key[0], block_key[1], block_key[2][0].n3(), block_key[2][1].n3())):
+        ontology_1_entities, ontology_2_entities = blocks[block_key]
+        propagation_statistics["blocks"] += 1
+        if max_block_size is not None and len(ontology_1_entities) * len(ontology_2_entities) > max_block_size:
+            propagation_statistics["skipped_blocks"] += 1
+            continue
+        propagation_statistics["candidates"] += len(ontology_1_entities) * len(ontology_2_entities)
+        ontology_2_entities = sorted(ontology_2_entities, key=lambda entity: entity.n3())
+        for entity_1 in sorted(ontology_1_entities, key=lambda entity: entity.n3()):
+            for entity_2 in ontology_2_entities:
+                yield entity_1, entity_2
+
+
+def add_matching_forms(matching_form_to_original_URI_dict, named_individuals, strip_namespace):
+    '''
+    Registers the named individuals of an ontology under their matching forms: their URIs, or their names (their URIs without their namespaces)
+    '''
+    for named_individual_instance in named_individuals:
+        if not strip_namespace:
+            matching_form_to_original_URI_dict[named_individual_instance] = named_individual_instance
+            continue
+        instance_name_striped_from_namespace = str(named_individual_instance).rpartition("#")[2]
+        # if another entity has already been registered with the same matching form in this ontology, (same name, different namespaces), then we report an error!
+        if instance_name_striped_from_namespace in matching_form_to_original_URI_dict:
+            error_message = "Different entities were attempted to be registered under the same name! Matching method: stripping namespace.\n"
+            other_URI = matching_form_to_original_URI_dict[instance_name_striped_from_namespace]
+            error_message += f"{other_URI}  --  {named_individual_instance}"
+            raise ValueError(error_message)
+        matching_form_to_original_URI_dict[instance_name_striped_from_namespace] = named_individual_instance
 
 
 def get_common_instances_across_ontologies(ontology_1, ontology_2, method_keyword_set,
                                            provided_aligned_individuals=None, provided_aligned_properties=None,
-                                           provided_handcrafted_aligned_properties=None, prefix_pair=None):
+                                           provided_handcrafted_aligned_properties=None, prefix_pair=None, max_block_size=None,
+                                           alignment_conflicts=None, propagation_rounds=None):
     '''
     applies some vanilla instance matching methods on two ontologies and returns a set of aligned URIs.
     An instance is defined as an URI that is rdf:type owl:NamedIndividual
@@ -44,6 +209,10 @@ def get_common_instances_across_ontologies(ontology_1, ontology_2, method_keywor
     :param ontology_1: a rdflib.Graph instance
     :param ontology_2:  a rdflib.Graph instance
     :param method_keyword_set: "same_URI", "same_name", "same_relation", "same_relation_handcrafted", "handcrafted_queries" ,
+    :param max_block_size: (optional) the maximum number of candidate pairs of a block of the relation based matching (see iterate_relation_based_candidate_alignments)
+    :param alignment_conflicts: (optional) list, to which the conflicts among the proposed alignments are appended (see InstanceAlignmentResolver.get_conflicts)
+    :param propagation_rounds: (optional) list, to which a dictionary with the counts of every round of the relation based propagation is appended
+    (expanded alignments, property alignments, blocks, skipped blocks, candidates and new alignments)
     :return: aligned_individuals = set((URI1, URI2), (URI3, URI4), ...)
     '''
 
@@ -62,67 +231,42 @@ def get_common_instances_across_ontologies(ontology_1, ontology_2, method_keywor
         ontology_2_individuals.add(named_individual_instance)
 
     if "same_URI" in method_keyword_set:
-        for named_individual_instance in ontology_1_individuals:
-            matching_form_to_original_URI_dict_ontology_1[named_individual_instance] = named_individual_instance
-        for named_individual_instance in ontology_2_individuals:
-            matching_form_to_original_URI_dict_ontology_2[named_individual_instance] = named_individual_instance
+        add_matching_forms(matching_form_to_original_URI_dict_ontology_1, ontology_1_individuals, strip_namespace=False)
+        add_matching_forms(matching_form_to_original_URI_dict_ontology_2, ontology_2_individuals, strip_namespace=False)
 
     if "same_name" in method_keyword_set:
-        for named_individual_instance in ontology_1_individuals:
-            instance_name_striped_from_namespace = str(named_individual_instance).split("#")[-1]
-            # if another entity has already been registered with the same matching form in this ontology, (same name, different namespaces), then we report an error!
-            if instance_name_striped_from_namespace in matching_form_to_original_URI_dict_ontology_1:
-                error_message = "Different entities were attempted to be registered under the same name! Matching method: stripping namespace.\n"
-                other_URI = matching_form_to_original_URI_dict_ontology_1[instance_name_striped_from_namespace]
-                error_message += f"{other_URI}  --  {named_individual_instance}"
-                raise ValueError(error_message)
-            matching_form_to_original_URI_dict_ontology_1[
-                instance_name_striped_from_namespace] = named_individual_instance
-        for named_individual_instance in ontology_2_individuals:
-            instance_name_striped_from_namespace = str(named_individual_instance).split("#")[-1]
-            # if another entity has already been registered with the same matching form in this ontology, (same name, different namespaces), then we report an error!
-            if instance_name_striped_from_namespace in matching_form_to_original_URI_dict_ontology_2:
-                error_message = "Different entities were attempted to be registered under the same name! Matching method: stripping namespace.\n"
-                other_URI = matching_form_to_original_URI_dict_ontology_2[instance_name_striped_from_namespace]
-                error_message += f"{other_URI}  --  {named_individual_instance}"
-                raise ValueError(error_message)
-            matching_form_to_original_URI_dict_ontology_2[
-                instance_name_striped_from_namespace] = named_individual_instance
+        add_matching_forms(matching_form_to_original_URI_dict_ontology_1, ontology_1_individuals, strip_namespace=True)
+        add_matching_forms(matching_form_to_original_URI_dict_ontology_2, ontology_2_individuals, strip_namespace=True)
 
     form_based_alignments = set()
 
     if provided_aligned_individuals is not None:
-        form_based_alignments += provided_aligned_individuals
+        form_based_alignments.update(provided_aligned_individuals)
 
-    for ontology_1_entity_form in matching_form_to_original_URI_dict_ontology_1:
-        if ontology_1_entity_form in matching_form_to_original_URI_dict_ontology_2:
-            ontology_1_entity_URI = matching_form_to_original_URI_dict_ontology_1[ontology_1_entity_form]
-            # since the forms are matching, then we can use ontology_1_entity_form to retrieve the corresponding URI in ontology 2
-            ontology_2_entity_URI = matching_form_to_original_URI_dict_ontology_2[ontology_1_entity_form]
-            alignment = (ontology_1_entity_URI, ontology_2_entity_URI)
-            form_based_alignments.add(alignment)
+    # hash join of the matching forms of the two ontologies
+    for matching_form in matching_form_to_original_URI_dict_ontology_1.keys() & matching_form_to_original_URI_dict_ontology_2.keys():
+        alignment = (matching_form_to_original_URI_dict_ontology_1[matching_form], matching_form_to_original_URI_dict_ontology_2[matching_form])
+        form_based_alignments.add(alignment)
 
-    formed_based_matchings_dict_format = dict()
     URIs_of_certain_alignments = set()
     for ontology_1_entity_URI, ontology_2_entity_URI in form_based_alignments:
-        # identity mappings can be found here from the "same_URI" option, so no need to check for errors.
-        formed_based_matchings_dict_format[ontology_1_entity_URI] = ontology_2_entity_URI
-        formed_based_matchings_dict_format[ontology_2_entity_URI] = ontology_1_entity_URI
         URIs_of_certain_alignments.add(ontology_1_entity_URI)
         URIs_of_certain_alignments.add(ontology_2_entity_URI)
 
     all_alignments = form_based_alignments.copy()
 
-    searched_alignments_and_relations = set()
+    # the alignments that are found by the following methods are only kept if they are not in conflict with any other alignment
+    alignment_resolver = InstanceAlignmentResolver()
+    alignment_resolver.add_accepted_alignments(form_based_alignments)
 
     if "same_relation" in method_keyword_set or "same_relation_handcrafted" in method_keyword_set:
-        relation_alignments_to_use = set()
+        relation_alignments_to_use = []
         if "same_relation" in method_keyword_set:
             if provided_aligned_properties is None:
                 raise ValueError(
                     "On aligning instances, 'same_relation' was selected but no property alignments were provided!")
             else:
-                relation_alignments_to_use = provided_aligned_properties
+                relation_alignments_to_use = list(provided_aligned_properties)
         if "same_relation_handcrafted" in method_keyword_set:
             if provided_handcrafted_aligned_properties is None:
                 raise ValueError(
@@ -130,242 +274,383 @@ def get_common_instances_across_ontologies(ontology_1, ontology_2, method_keywor
             else:
                 relation_alignments_to_use += provided_handcrafted_aligned_properties
 
-        alignment_conflicts = defaultdict(set)
-        more_cases_found = True
-        all_alignments_dict_format = formed_based_matchings_dict_format.copy()
-        clean_new_relationship_alignments = set()
-        clean_relationship_alignments = set()
-        # Maybe let's not get into the loop version yet, cause a proper implementation would require recursion.
-        while more_cases_found:
-            new_alignments = set()
-            # for every so-far known entity alignment
-            for ontology_1_entity_URI, ontology_2_entity_URI in all_alignments:
-                # for every known property alignment
-                for relation_1_URI, relation_2_URI in relation_alignments_to_use:
-                    relation_1_URI, relation_2_URI = URIRef(relation_1_URI), URIRef(relation_2_URI)
-
-                    # we don't want to keep on counting the same candidate match over all iterations
-                    search_combination = (ontology_1_entity_URI, ontology_2_entity_URI, relation_1_URI, relation_2_URI)
-                    if search_combination in searched_alignments_and_relations:
-                        continue
-
-                    searched_alignments_and_relations.add(search_combination)
-                    # searching for matching objects
-                    ontology_1_objects = set(ontology_1.objects(ontology_1_entity_URI, relation_1_URI))
-                    ontology_2_objects = set(ontology_2.objects(ontology_2_entity_URI, relation_2_URI))
-
-                    for object_1 in ontology_1_objects:
-                        for object_2 in ontology_2_objects:
-                            if object_1 not in URIs_of_certain_alignments and object_2 not in URIs_of_certain_alignments:
-                                candidate_alignment = (object_1, object_2)
-                                if candidate_alignment not in all_alignments:
-                                    new_alignments.add(candidate_alignment)
-
-                    # searching for matching subjects
-                    ontology_1_subjects = set(ontology_1.subjects(relation_1_URI, ontology_1_entity_URI))
-                    ontology_2_subjects = set(ontology_2.subjects(relation_2_URI, ontology_2_entity_URI))
-                    for subject_1 in ontology_1_subjects:
-                        for subject_2 in ontology_2_subjects:
-                            if subject_1 not in URIs_of_certain_alignments and subject_2 not in URIs_of_certain_alignments:
-                                candidate_alignment = (subject_1, subject_2)
-                                if candidate_alignment not in all_alignments:
-                                    new_alignments.add(candidate_alignment)
-
-            more_cases_found = True if len(new_alignments) > 0 else False
-
-            clean_new_relationship_alignments, alignment_conflicts, all_alignments_dict_format = clean_instance_alignments(
-                all_alignments_dict_format, new_alignments, alignment_conflicts)
-            all_alignments = all_alignments.union(clean_new_relationship_alignments)
-
-            clean_relationship_alignments = clean_relationship_alignments.union(clean_new_relationship_alignments)
-            alignment_conflicts_pair_set = set()
-            for URI_1 in alignment_conflicts:
-                for URI_2 in alignment_conflicts[URI_1]:
-                    alignment_conflicts_pair_set.add((URI_1, URI_2))
-            clean_relationship_alignments = clean_relationship_alignments - alignment_conflicts_pair_set
-
-    else:
-        all_alignments_dict_format = dict()
-        alignment_conflicts = set()
+        # property alignments are converted to URIRefs once (ignoring duplicates), and they are always used in the same order
+        relation_alignments_to_use = sorted({(URIRef(relation_1_URI), URIRef(relation_2_URI))
+                                             for relation_1_URI, relation_2_URI in relation_alignments_to_use})
+
+        # The alignments are propagated through the aligned properties until no more alignments are found (a fixpoint), using
+        # semi-naive evaluation: every round only expands the alignments that were found in the previous round, since the older ones
+        # have already been expanded with every property alignment, and expanding them again cannot propose any new candidates.
+        # The triples of the aligned properties are indexed once, and every round only probes the indexes with its own alignments.
+        relation_indexes_1 = get_relation_indexes(ontology_1, {relation_1_URI for relation_1_URI, _ in relation_alignments_to_use})
+        relation_indexes_2 = get_relation_indexes(ontology_2, {relation_2_URI for _, relation_2_URI in relation_alignments_to_use})
+        delta_alignments = form_based_alignments
+        while len(delta_alignments) > 0:
+            propagation_statistics = defaultdict(int)
+            # the candidates are streamed to the conflict resolution, in the order they are proposed
+            for ontology_1_entity_URI, ontology_2_entity_URI in iterate_relation_based_candidate_alignments(
+                    relation_indexes_1, relation_indexes_2, delta_alignments, relation_alignments_to_use, URIs_of_certain_alignments, max_block_size, propagation_statistics):
+                alignment_resolver.add_candidate_alignment(ontology_1_entity_URI, ontology_2_entity_URI)
+            new_relationship_alignments = alignment_resolver.resolve_round()
+            all_alignments.update(new_relationship_alignments)
+
+            if propagation_rounds is not None:
+                propagation_rounds.append({"expanded_alignments": len(delta_alignments), "property_alignments": len(relation_alignments_to_use),
+                                           "blocks": propagation_statistics["blocks"], "skipped_blocks": propagation_statistics["skipped_blocks"],
+                                           "candidates": propagation_statistics["candidates"], "new_alignments": len(new_relationship_alignments)})
+            delta_alignments = new_relationship_alignments
 
     if "handcrafted_queries" in method_keyword_set:
         alignments_from_handcrafted_queries = run_sparql_queries_for_instance_matching_on_ontology_pair(ontology_1,
                                                                                                         ontology_2,
                                                                                                         prefix_pair)
+        # sorted, so that the conflicts among them are resolved in an order that does not depend on the hash seed
+        for ontology_1_entity_URI, ontology_2_entity_URI in sorted(alignments_from_handcrafted_queries,
+                                                                   key=lambda alignment: (alignment[0].n3(), alignment[1].n3())):
+            alignment_resolver.add_candidate_alignment(ontology_1_entity_URI, ontology_2_entity_URI)
+        all_alignments.update(alignment_resolver.resolve_round())
 
-        clean_alignments_from_handcrafted_queries, alignment_conflicts, all_alignments_dict_format = clean_instance_alignments(
-            all_alignments_dict_format, alignments_from_handcrafted_queries, alignment_conflicts)
-
-        all_alignments = all_alignments.union(clean_alignments_from_handcrafted_queries)
+    if alignment_conflicts is not None:
+        alignment_conflicts += alignment_resolver.get_conflicts()
 
     return all_alignments
 
 
-def run_sparql_queries_for_instance_matching_on_ontology_pair(ontology_1, ontology_2, prefix_pair):
+# In this dictionary, we define the sparql queries that help us identify more instance alignments for the extended dataset construction
+# These are mentioned as "complex queries" on the paper. In the code they are referred to as "handcrafted queries"
+ontology_pair_instance_matching_queries_dict = {
+    "cmt-iasted":
+        [
+            '''
+    PREFIX owl: <http://www.w3.org/2002/07/owl#>
+    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+    PREFIX cmt: <http://cmt#>
+    PREFIX confOf: <http://confOf#>
+    PREFIX edas: <http://edas#>
+    PREFIX ekaw: <http://ekaw#>
+    PREFIX iasted: <http://iasted#>
+    PREFIX sigkdd: <http://sigkdd#>
+    PREFIX conference: <http://conference#>
+
+    SELECT DISTINCT ?cmt_review ?iasted_review WHERE {
+      ?iasted_review rdf:type iasted:Review .
+      ?iasted_review iasted:is_writen_by ?common_reviewer .
+      ?cmt_review cmt:writtenBy ?common_reviewer .
+      ?cmt_review rdf:type cmt:Review .
+    }    '''
+        ],
+
+    "confof-ekaw":
+        [
+
+            '''
+    PREFIX owl: <http://www.w3.org/2002/07/owl#>
+    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+    PREFIX cmt: <http://cmt#>
+    PREFIX confOf: <http://confOf#>
+    PREFIX edas: <http://edas#>
+    PREFIX ekaw: <http://ekaw#>
+    PREFIX iasted: <http://iasted#>
+    PREFIX sigkdd: <http://sigkdd#>
+    PREFIX conference: <http://conference#>
+
+    SELECT DISTINCT ?confof_paper ?ekaw_paper WHERE {
+        ?confof_paper rdf:type confOf:Contribution .
+        ?confof_paper confOf:writtenBy ?author .
+
+        ?ekaw_paper ekaw:writtenBy ?author.
+        ?ekaw_paper rdf:type ekaw:Paper .
+    }      '''
+        ],
+
+    "edas-iasted":
+        [
+            '''
+    PREFIX owl: <http://www.w3.org/2002/07/owl#>
+    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+    PREFIX cmt: <http://cmt#>
+    PREFIX confOf: <http://confOf#>
+    PREFIX edas: <http://edas#>
+    PREFIX ekaw: <http://ekaw#>
+    PREFIX iasted: <http://iasted#>
+    PREFIX sigkdd: <http://sigkdd#>
+    PREFIX conference: <http://conference#>
+
+    SELECT DISTINCT ?edas_paper ?iasted_paper WHERE {
+      ?edas_paper rdf:type edas:Paper.
+      ?edas_paper edas:isWrittenBy ?author.
+
+      ?iasted_paper rdf:type iasted:Submission .
+      ?iasted_paper iasted:is_writen_by ?author .
+    }   '''
+        ],
+
+    "ekaw-iasted":
+
+        [
+            """
+            PREFIX owl: <http://www.w3.org/2002/07/owl#>
+    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+    PREFIX cmt: <http://cmt#>
+    PREFIX confOf: <http://confOf#>
+    PREFIX edas: <http://edas#>
+    PREFIX ekaw: <http://ekaw#>
+    PREFIX iasted: <http://iasted#>
+    PREFIX sigkdd: <http://sigkdd#>
+    PREFIX conference: <http://conference#>
+
+    SELECT DISTINCT ?ekaw_review ?iasted_review WHERE {
+      ?ekaw_review rdf:type ekaw:Review .
+      ?ekaw_review ekaw:writtenBy ?common_reviewer .
+
+      ?iasted_review rdf:type iasted:Review .
+      ?iasted_review iasted:is_writen_by ?common_reviewer .
+
+    }   """
+        ]
+
+}
+
+def parse_instance_matching_query(query_text):
     '''
-    # In this function, we define the sparql queries that help us identify more instance alignments for the extended dataset construction
-    # These are mentioned as "complex queries" on the paper. In the code they are referred to as "handcrafted queries"
+    Parses a handcrafted query, which has to be a SELECT query over a basic graph pattern (a conjunction of triple patterns with a fixed predicate)
+    :return: the projected variables and the triple patterns of the query
     '''
-    ontology_pair_instance_matching_queries_dict = {
-        "cmt-iasted":
-            [
-                '''
-        PREFIX owl: <http://www.w3.org/2002/07/owl#>
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-
-        PREFIX cmt: <http://cmt#>
-        PREFIX confOf: <http://confOf#>
-        PREFIX edas: <http://edas#>
-        PREFIX ekaw: <http://ekaw#>
-        PREFIX iasted: <http://iasted#>
-        PREFIX sigkdd: <http://sigkdd#>
-        PREFIX conference: <http://conference#>
-
-        SELECT DISTINCT ?cmt_review ?iasted_review WHERE {
-          ?iasted_review rdf:type iasted:Review .
-          ?iasted_review iasted:is_writen_by ?common_reviewer .
-          ?cmt_review cmt:writtenBy ?common_reviewer .
-          ?cmt_review rdf:type cmt:Review .
-        }    '''
-            ],
-
-        "confof-ekaw":
-            [
-
-                '''
-        PREFIX owl: <http://www.w3.org/2002/07/owl#>
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-
-        PREFIX cmt: <http://cmt#>
-        PREFIX confOf: <http://confOf#>
-        PREFIX edas: <http://edas#>
-        PREFIX ekaw: <http://ekaw#>
-        PREFIX iasted: <http://iasted#>
-        PREFIX sigkdd: <http://sigkdd#>
-        PREFIX conference: <http://conference#>
-
-        SELECT DISTINCT ?confof_paper ?ekaw_paper WHERE {
-            ?confof_paper rdf:type confOf:Contribution .
-            ?confof_paper confOf:writtenBy ?author .
-
-            ?ekaw_paper ekaw:writtenBy ?author.
-            ?ekaw_paper rdf:type ekaw:Paper .
-        }      '''
-            ],
-
-        "edas-iasted":
-            [
-                '''
-        PREFIX owl: <http://www.w3.org/2002/07/owl#>
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-
-        PREFIX cmt: <http://cmt#>
-        PREFIX confOf: <http://confOf#>
-        PREFIX edas: <http://edas#>
-        PREFIX ekaw: <http://ekaw#>
-        PREFIX iasted: <http://iasted#>
-        PREFIX sigkdd: <http://sigkdd#>
-        PREFIX conference: <http://conference#>
-
-        SELECT DISTINCT ?edas_paper ?iasted_paper WHERE {
-          ?edas_paper rdf:type edas:Paper.
-          ?edas_paper edas:isWrittenBy ?author.
-
-          ?iasted_paper rdf:type iasted:Submission .
-          ?iasted_paper iasted:is_writen_by ?author .
-        }   '''
-            ],
-
-        "ekaw-iasted":
-
-            [
-                """
-                PREFIX owl: <http://www.w3.org/2002/07/owl#>
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-
-        PREFIX cmt: <http://cmt#>
-        PREFIX confOf: <http://confOf#>
-        PREFIX edas: <http://edas#>
-        PREFIX ekaw: <http://ekaw#>
-        PREFIX iasted: <http://iasted#>
-        PREFIX sigkdd: <http://sigkdd#>
-        PREFIX conference: <http://conference#>
-
-        SELECT DISTINCT ?ekaw_review ?iasted_review WHERE {
-          ?ekaw_review rdf:type ekaw:Review .
-          ?ekaw_review ekaw:writtenBy ?common_reviewer .
-
-          ?iasted_review rdf:type iasted:Review .
-          ?iasted_review iasted:is_writen_by ?common_reviewer .
-
-        }   """
-            ]
-
-    }
-
-    merged_ontologies = ontology_1 + ontology_2
+    query_algebra = prepareQuery(query_text).algebra
+    if query_algebra.name != "SelectQuery":
+        raise ValueError("Only SELECT queries are supported by the handcrafted query engine")
+    graph_pattern = query_algebra.p
+    while graph_pattern.name in ("Distinct", "Project"):
+        graph_pattern = graph_pattern.p
+    if graph_pattern.name != "BGP":
+        raise ValueError("Only basic graph patterns are supported by the handcrafted query engine, found " + graph_pattern.name)
+    for _, predicate, _ in graph_pattern.triples:
+        if not isinstance(predicate, URIRef):
+            raise ValueError("Only triple patterns with a fixed predicate are supported by the handcrafted query engine")
+    return query_algebra.PV, graph_pattern.triples
+
+def get_triple_pattern_solutions(ontologies, triple_pattern):
+    '''
+    Finds the solutions of one triple pattern in the union of the given ontologies, using the (predicate) indexes of every ontology,
+    instead of copying the ontologies into one merged graph
+    :return: the variables of the triple pattern, and the set of the tuples of values they take
+    '''
+    subject_term, predicate, object_term = triple_pattern
+    pattern_variables = tuple(dict.fromkeys(term for term in (subject_term, object_term) if isinstance(term, Variable)))
+    lookup_subject = None if isinstance(subject_term, Variable) else subject_term
+    lookup_object = None if isinstance(object_term, Variable) else object_term
+
+    solutions = set()
+    for ontology in ontologies:
+        for triple_subject, _, triple_object in ontology.triples((lookup_subject, predicate, lookup_object)):
+            if subject_term == object_term and triple_subject != triple_object:
+                continue
+            values = {subject_term: triple_subject, object_term: triple_object}
+            solutions.add(tuple(values[variable] for variable in pattern_variables))
+    return pattern_variables, solutions
+
+def evaluate_basic_graph_pattern(ontologies, projected_variables, triple_patterns):
+    '''
+    Evaluates a basic graph pattern on the union of the given ontologies with hash joins. The most selective triple pattern is
+    evaluated first, and every next triple pattern is the smallest one that shares a variable with the ones joined so far
+    (typically, the type constraint of a variable, or the relation that joins the subjects or objects of the two ontologies)
+    :return: the set of distinct tuples of the projected variables
+    '''
+    remaining_patterns = [get_triple_pattern_solutions(ontologies, triple_pattern) for triple_pattern in triple_patterns]
+    remaining_patterns.sort(key=lambda pattern: len(pattern[1]))
+
+    joined_variables, joined_solutions = (), {()}
+    while remaining_patterns:
+        next_pattern_index = next((i for i, (pattern_variables, _) in enumerate(remaining_patterns)
+                                   if set(pattern_variables) & set(joined_variables)), 0)
+        pattern_variables, pattern_solutions = remaining_patterns.pop(next_pattern_index)
+
+        shared_positions = [(joined_variables.index(variable), pattern_variables.index(variable))
+                            for variable in pattern_variables if variable in joined_variables]
+        new_positions = [i for i, variable in enumerate(pattern_variables) if variable not in joined_variables]
+
+        # hash the solutions of the triple pattern on the shared variables, and probe them with the solutions joined so far
+        pattern_solutions_by_key = defaultdict(list)
+        for pattern_solution in pattern_solutions:
+            pattern_solutions_by_key[tuple(pattern_solution[j] for _, j in shared_positions)].append(
+                tuple(pattern_solution[j] for j in new_positions))
+        joined_solutions = {joined_solution + new_values for joined_solution in joined_solutions
+                            for new_values in pattern_solutions_by_key.get(tuple(joined_solution[i] for i, _ in shared_positions), [])}
+        joined_variables += tuple(pattern_variables[j] for j in new_positions)
+
+    projected_positions = [joined_variables.index(variable) for variable in projected_variables]
+    return {tuple(joined_solution[i] for i in projected_positions) for joined_solution in joined_solutions}
 
+def run_sparql_queries_for_instance_matching_on_ontology_pair(ontology_1, ontology_2, prefix_pair):
+    '''
+    Runs the handcrafted queries of the ontology pair (see ontology_pair_instance_matching_queries_dict) on the two ontologies
+    :return: the set of the proposed instance alignments
+    '''
     alignments_set = set()
-    if prefix_pair in ontology_pair_instance_matching_queries_dict:
-        for query_text in ontology_pair_instance_matching_queries_dict[prefix_pair]:
-            results = merged_ontologies.query(query_text)
-            alignments_set = alignments_set.union(set(results))
+    for query_text in ontology_pair_instance_matching_queries_dict.get(prefix_pair, []):
+        projected_variables, triple_patterns = parse_instance_matching_query(query_text)
+        alignments_set.update(evaluate_basic_graph_pattern((ontology_1, ontology_2), projected_variables, triple_patterns))
 
     return alignments_set
 
+def check_handcrafted_queries_against_rdflib(ontology_1, ontology_2, prefix_pair):
+    '''
+    Checks that the handcrafted query engine returns the same alignments as the rdflib SPARQL engine on the merged ontologies
+    '''
+    if prefix_pair not in ontology_pair_instance_matching_queries_dict:
+        return
+    merged_ontologies = ontology_1 + ontology_2
+    for query_text in ontology_pair_instance_matching_queries_dict[prefix_pair]:
+        projected_variables, triple_patterns = parse_instance_matching_query(query_text)
+        engine_results = evaluate_basic_graph_pattern((ontology_1, ontology_2), projected_variables, triple_patterns)
+        rdflib_results = set(tuple(row) for row in merged_ontologies.query(query_text))
+        if engine_results != rdflib_results:
+            raise ValueError(f"The handcrafted query engine disagrees with rdflib on {prefix_pair}: "
+                             f"{len(engine_results - rdflib_results)} extra and {len(rdflib_results - engine_results)} missing results")
+
+def write_lines_atomically(lines, file_path):
+    '''
+    Writes the given lines to a temporary file next to file_path, which then replaces file_path in one step, so that an
+    interrupted (or concurrent) run never leaves a partially written file behind
+    '''
+    temporary_file_path = file_path + "." + str(os.getpid()) + ".tmp"
+    try:
+        with open(temporary_file_path, "w") as temporary_file:
+            for line in lines:
+                temporary_file.write(line + "\n")
+        os.replace(temporary_file_path, file_path)
+    finally:
+        if os.path.exists(temporary_file_path):
+            os.remove(temporary_file_path)
+
+def write_alignment_conflicts_report(alignment_conflicts, file_path):
+    '''
+    Writes one line per conflict: the conflicting entities of the first ontology, and then the ones of the second ontology
+    '''
+    write_lines_atomically([" ".join(str(URI) for URI in ontology_1_entities) + " | "
+                            + " ".join(str(URI) for URI in ontology_2_entities)
+                            for ontology_1_entities, ontology_2_entities in alignment_conflicts], file_path)
+
+def generate_ontology_pair_instance_alignments(alignment_inputs, prefix_pair):
+    '''
+    Produces the instance alignments of one ontology pair, and writes them (and the conflicts among them) to the output directories
+    :param alignment_inputs: dictionary with the loaded ontologies ("ontologies", by prefix), their property alignments
+    ("aligned_properties" and "handcrafted_aligned_properties", by prefix pair), the output directories and whether the
+    handcrafted queries are checked against rdflib ("check_handcrafted_queries")
+    :return: the number of produced instance alignments, the number of conflicts and the counts of every propagation round
+    '''
+    prefix_1, prefix_2 = prefix_pair.split("-")
+    if alignment_inputs["check_handcrafted_queries"]:
+        check_handcrafted_queries_against_rdflib(alignment_inputs["ontologies"][prefix_1], alignment_inputs["ontologies"][prefix_2], prefix_pair)
+
+    alignment_conflicts = []
+    propagation_rounds = []
+    produced_alignments = get_common_instances_across_ontologies(alignment_inputs["ontologies"][prefix_1],
+                                                                 alignment_inputs["ontologies"][prefix_2],
+                                                                 {"same_name", "same_relation",
+                                                                  "same_relation_handcrafted",
+                                                                  "handcrafted_queries"},
+                                                                 provided_aligned_properties=alignment_inputs["aligned_properties"][prefix_pair],
+                                                                 provided_handcrafted_aligned_properties=alignment_inputs["handcrafted_aligned_properties"][prefix_pair],
+                                                                 prefix_pair=prefix_pair,
+                                                                 alignment_conflicts=alignment_conflicts,
+                                                                 propagation_rounds=propagation_rounds)
+    if alignment_inputs["conflict_reports_dir"] is not None:
+        write_alignment_conflicts_report(alignment_conflicts, os.path.join(alignment_inputs["conflict_reports_dir"], prefix_pair + ".txt"))
+
+    # sorted, so that the produced file does not depend on the (hash based) iteration order of the alignments
+    write_lines_atomically(sorted(str(URI_1) + "," + str(URI_2) for URI_1, URI_2 in produced_alignments),
+                           os.path.join(alignment_inputs["out_alignments_dir"], prefix_pair + ".csv"))
+    return len(produced_alignments), len(alignment_conflicts), propagation_rounds
+
+# the loaded ontologies and property alignments, in an instance alignment worker process
+instance_alignment_worker_inputs = None
+
+def initialise_instance_alignment_worker(alignment_inputs):
+    global instance_alignment_worker_inputs
+    instance_alignment_worker_inputs = alignment_inputs
+
+def generate_ontology_pair_instance_alignments_in_worker(prefix_pair):
+    return generate_ontology_pair_instance_alignments(instance_alignment_worker_inputs, prefix_pair)
+
 def generate_instance_alignments(reasoned_ontologies_dir, reference_alignments_dir,
-                                 handcrafted_reference_alignments_dir, out_alignments_dir):
+                                 handcrafted_reference_alignments_dir, out_alignments_dir, conflict_reports_dir=None,
+                                 workers=1, check_handcrafted_queries=False):
+    '''
+    :param conflict_reports_dir: (optional) directory, where the conflicts among the proposed alignments of every ontology pair are reported
+    :param workers: number of processes that produce the alignments of different ontology pairs in parallel. Every ontology
+    and alignment file is loaded only once, in the main process, and is shared read only with the workers (inherited
+    through fork, or sent once per worker with other start methods)
+    :param check_handcrafted_queries: whether the results of the handcrafted query engine are checked against the rdflib SPARQL
+    engine on the merged ontologies of every pair (see check_handcrafted_queries_against_rdflib). It is off by default, since it
+    builds the merged graphs that the engine avoids; the shipped dataset/produced_instance_alignments were validated with it
+    '''
 
-    ontology_prefixes_list = get_all_ontology_prefixes()
     all_prefix_pairs = get_all_prefix_pairs()
-    prefix_to_ontology_dict = {}
+    alignment_inputs = {"ontologies": {}, "aligned_properties": {}, "handcrafted_aligned_properties": {},
+                        "out_alignments_dir": out_alignments_dir, "conflict_reports_dir": conflict_reports_dir,
+                        "check_handcrafted_queries": check_handcrafted_queries}
 
     # read all ontologies
-    for ontology_prefix in ontology_prefixes_list:
-        prefix_to_ontology_dict[ontology_prefix] = Graph()
-        prefix_to_ontology_dict[ontology_prefix].parse(reasoned_ontologies_dir + "/" + ontology_prefix + ".owl")
-
-    # make sure the directory exists
-    if not os.path.isdir(out_alignments_dir):
-        os.mkdir(out_alignments_dir)
+    for ontology_prefix in get_all_ontology_prefixes():
+        alignment_inputs["ontologies"][ontology_prefix] = load_ontology_graph(reasoned_ontologies_dir + "/" + ontology_prefix + ".owl")
 
     for prefix_pair in all_prefix_pairs:
         prefix_1, prefix_2 = prefix_pair.split("-")
-
-        ontology_1 = prefix_to_ontology_dict[prefix_1]
-        ontology_2 = prefix_to_ontology_dict[prefix_2]
-
         # see if we know equivalency pairs among these classes, including property equivalencies
-        equivalent_classes, equivalent_properties = load_ontology_alignments(ont_1_prefix=prefix_1,
-                                                                             ont_2_prefix=prefix_2,
-                                                                             dir_path=reference_alignments_dir)
+        _, alignment_inputs["aligned_properties"][prefix_pair] = load_ontology_alignments(ont_1_prefix=prefix_1,
+                                                                                          ont_2_prefix=prefix_2,
+                                                                                          dir_path=reference_alignments_dir)
         # in case there is a file with handwritten Property equivalencies, then read them as well.
         try:
-            _, handcrafted_equivalent_properties = load_ontology_alignments(ont_1_prefix=prefix_1,
-                                                                            ont_2_prefix=prefix_2,
-                                                                            dir_path=handcrafted_reference_alignments_dir)
+            _, alignment_inputs["handcrafted_aligned_properties"][prefix_pair] = load_ontology_alignments(ont_1_prefix=prefix_1,
+                                                                                                          ont_2_prefix=prefix_2,
+                                                                                                          dir_path=handcrafted_reference_alignments_dir)
         except ValueError:
-            handcrafted_equivalent_properties = []
+            alignment_inputs["handcrafted_aligned_properties"][prefix_pair] = []
 
-        produced_alignments = get_common_instances_across_ontologies(ontology_1, ontology_2,
-                                                                     {"same_name", "same_relation",
-                                                                      "same_relation_handcrafted",
-                                                                      "handcrafted_queries"},
-                                                                     provided_aligned_properties=equivalent_properties,
-                                                                     provided_handcrafted_aligned_properties=handcrafted_equivalent_properties,
-                                                                     prefix_pair=prefix_pair)
+    # make sure the directory exists
+    if not os.path.isdir(out_alignments_dir):
+        os.mkdir(out_alignments_dir)
+    if conflict_reports_dir is not None and not os.path.isdir(conflict_reports_dir):
+        os.mkdir(conflict_reports_dir)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=initialise_instance_alignment_worker,
+                                 initargs=(alignment_inputs,)) as executor:
+            # the outcomes are returned in the order of the prefix pairs, independently of the order they finish in
+            pair_outcomes = list(executor.map(generate_ontology_pair_instance_alignments_in_worker, all_prefix_pairs))
+    else:
+        pair_outcomes = [generate_ontology_pair_instance_alignments(alignment_inputs, prefix_pair) for prefix_pair in all_prefix_pairs]
 
-        with open(out_alignments_dir + "/" + prefix_pair + ".csv", "w") as produced_alignments_out_file:
-            for URI_1, URI_2 in produced_alignments:
-                produced_alignments_out_file.write(str(URI_1) + "," + str(URI_2) + "\n")
+    # the pairs are logged here, and not by the workers, so that the lines of different pairs are not interleaved
+    for prefix_pair, (num_produced_alignments, num_alignment_conflicts, propagation_rounds) in zip(all_prefix_pairs, pair_outcomes):
+        for propagation_round, round_counts in enumerate(propagation_rounds, start=1):
+            print(f"{prefix_pair} relation propagation, round {propagation_round}: expanded {round_counts['expanded_alignments']} alignments "
+                  f"with {round_counts['property_alignments']} property alignments, {round_counts['blocks']} blocks "
+                  f"({round_counts['skipped_blocks']} skipped), {round_counts['candidates']} candidates, "
+                  f"{round_counts['new_alignments']} new alignments")
+        print(f"{prefix_pair}: {num_produced_alignments} instance alignments, {num_alignment_conflicts} conflicts")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--check_handcrafted_queries", action="store_true",
+                        help='also run the handcrafted queries with rdflib on the merged ontologies of every pair, and fail if the '
+                             'results differ from the ones of the handcrafted query engine (slower, and off by default)')
+    args = parser.parse_args()
+
     generate_instance_alignments(
         reasoned_ontologies_dir="dataset/reasoned_ontologies",
         reference_alignments_dir="dataset/reference_alignments_owl",
         handcrafted_reference_alignments_dir="data_preparation/hand_picked_property_based_alignments",
-        out_alignments_dir="dataset/produced_instance_alignments")
+        out_alignments_dir="dataset/produced_instance_alignments",
+        workers=os.cpu_count(),
+        check_handcrafted_queries=args.check_handcrafted_queries)
@@ -9,17 +9,25 @@ if __name__ == '__main__':
     parser.add_argument("--repetitions", default=10, type=int)
     parser.add_argument("--max_steps", default=100, type=int)
     parser.add_argument("--eval_every", default=1, type=int)
+    parser.add_argument("--seed", default=None, type=int, help='master seed, for reproducible experiments. Required with --resume, --workers and --repetition_workers')
+    parser.add_argument("--workers", default=1, type=int, help='number of processes that execute ontology pairs in parallel')
+    parser.add_argument("--resume", action="store_true", help='resume an interrupted experiment, skipping its checkpointed query experiments')
+    parser.add_argument("--repetition_workers", default=1, type=int, help='number of processes that execute the repetitions of a query in parallel')
 
     # Dataset Parameters
     parser.add_argument('--dataset_dir', type=str, default="dataset")
     parser.add_argument('--data_directory', type=str, default="reasoned_ontologies")
     parser.add_argument('--reference_alignments_dir', type=str, default="reference_alignments_owl")
     parser.add_argument('--instance_alignments_dir', type=str, default="produced_instance_alignments")
-    parser.add_argument('--common_instances', type=str, default="simple", help='{"simple", "extended"}')
+    parser.add_argument('--common_instances', type=str, nargs="+", default=["simple"],
+                        help='{"simple", "extended"}. More than one values run a sweep, sharing the loaded agents across its configurations.')
+    parser.add_argument('--ontology_cache_dir', type=str, default=None,
+                        help='(optional) directory of pickled snapshots of the parsed ontologies, loaded instead of re-parsing the ontologies. '
+                             'Snapshots are unpickled, so only use a directory that you trust. Disabled by default.')
 
     # Agent policies
-    parser.add_argument('--teacher_policy', type=str, default="property-based", help='{"random", "property-based"}')
-    parser.add_argument('--student_policy', type=str, default="logic-based", help='{"logic-based", "frequency-based"}')
+    parser.add_argument('--teacher_policy', type=str, nargs="+", default=["property-based"], help='{"random", "property-based"}')
+    parser.add_argument('--student_policy', type=str, nargs="+", default=["logic-based"], help='{"logic-based", "frequency-based"}')
 
     args = parser.parse_args()
 
@@ -27,4 +35,8 @@ if __name__ == '__main__':
     if not os.path.exists(args.dataset_dir):
         raise ValueError("Dataset path could not be found!")
 
+    # resumed and parallel repetitions are only reproducible (and consistent with an uninterrupted sequential run) with a master seed
+    if args.seed is None and (args.resume or args.workers > 1 or args.repetition_workers > 1):
+        raise ValueError("argument --seed is required when using --resume, --workers or --repetition_workers!")
+
     run_all_teacher_student_combinations_using_gold_alignments(args)
\ No newline at end of file
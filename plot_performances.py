@@ -1,7 +1,8 @@
 from collections import defaultdict
-import pickle
+import numpy as np
 import matplotlib.pyplot as plt
 import os
+from data_utils import load_columnar_result_store
 
 extended_dataset_legend_2_exp_dir = {
 "Rand-Freq": "experiments/all_ontology_pairs__TP=random__SP=frequency-based__reps=10__instances=extended__max_steps=100",
@@ -15,14 +16,20 @@ simple_dataset_legend_2_exp_dir = {
 "Prop-Freq": "experiments/all_ontology_pairs__TP=property-based__SP=frequency-based__reps=10__instances=simple__max_steps=100",
 "Prop-Logic": "experiments/all_ontology_pairs__TP=property-based__SP=logic-based__reps=10__instances=simple__max_steps=100"}
 
+def load_average_performance_per_step(exp_dir):
+	# the step-wise metrics of all games of an experiment (see ColumnarResultStore in data_utils.py), averaged over the games
+	step_wise_results, index_arrays = load_columnar_result_store(os.path.join(exp_dir, "step_wise_results.npz"))
+	average_values = step_wise_results.get_mean()
+	steps = index_arrays["steps"].tolist()
+	return {metric: dict(zip(steps, average_values[:, i].tolist())) for i, metric in enumerate(step_wise_results.metric_names)}
+
 max_steps = 50
 steps = [i+1 for i in list(range(max_steps))]
 
 simple_exp_results = dict()
 for exp_legend in simple_dataset_legend_2_exp_dir:
 	simple_exp_results[exp_legend] = defaultdict(list)
-	with open(os.path.join(simple_dataset_legend_2_exp_dir[exp_legend], "av_stats_per_step_dict.pickle"), 'rb') as handle:
-		exp_performance = pickle.load(handle)
+	exp_performance = load_average_performance_per_step(simple_dataset_legend_2_exp_dir[exp_legend])
 	for metric in exp_performance:
 		for step in steps:
 			simple_exp_results[exp_legend][metric].append(exp_performance[metric][step])
@@ -30,9 +37,7 @@ for exp_legend in simple_dataset_legend_2_exp_dir:
 extended_exp_results = dict()
 for exp_legend in extended_dataset_legend_2_exp_dir:
 	extended_exp_results[exp_legend] = defaultdict(list)
-	with open(os.path.join(extended_dataset_legend_2_exp_dir[exp_legend], "av_stats_per_step_dict.pickle"),
-			  'rb') as handle:
-		exp_performance = pickle.load(handle)
+	exp_performance = load_average_performance_per_step(extended_dataset_legend_2_exp_dir[exp_legend])
 	for metric in exp_performance:
 		for step in steps:
 			extended_exp_results[exp_legend][metric].append(exp_performance[metric][step])